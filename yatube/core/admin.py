@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import Job, OutboundMail
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'args',
+        'attempts',
+        'run_after',
+        'failed',
+    )
+    list_filter = ('failed', 'name')
+    readonly_fields = ('created',)
+
+
+@admin.register(OutboundMail)
+class OutboundMailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'from_email',
+        'recipients',
+        'attempts',
+        'failed',
+        'created',
+    )
+    list_filter = ('failed',)
+    exclude = ('message',)
@@ -0,0 +1,130 @@
+"""ASGI-приложение поверх WSGI-обработчика Django.
+
+Django 2.2 не умеет ни асинхронных view, ни асинхронного ORM, поэтому
+запрос выполняется обычным WSGI-обработчиком в пуле потоков, а цикл
+событий только принимает соединения и пересылает тело ответа. Медленная
+лента занимает один поток пула, а не целый синхронный воркер: процесс
+одновременно обслуживает столько запросов, сколько потоков в пуле.
+"""
+import asyncio
+import itertools
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Тело запроса больше этого размера пишется во временный файл.
+MAX_BODY_IN_MEMORY = 2621440
+
+
+def build_environ(scope, body):
+    """WSGI environ по HTTP-scope ASGI и файлу с телом запроса."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами, декодированными как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class WSGIToASGI:
+    """ASGI 3 приложение, выполняющее WSGI-приложение в пуле потоков."""
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип scope: {scope["type"]}')
+        body = tempfile.SpooledTemporaryFile(MAX_BODY_IN_MEMORY)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+
+            def send_sync(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            await loop.run_in_executor(
+                self.executor, self.run, build_environ(scope, body),
+                send_sync)
+        finally:
+            body.close()
+
+    def run(self, environ, send):
+        """Выполняет WSGI-приложение и отдаёт ответ по частям."""
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [int(status.split(' ', 1)[0]), [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]]
+
+        def send_start():
+            status, headers = started
+            send({'type': 'http.response.start', 'status': status,
+                  'headers': headers})
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            chunks = iter(response)
+            # Заголовки уходят с первой частью тела: до неё WSGI-приложение
+            # может вызвать start_response ещё раз с exc_info.
+            first = next(chunks, b'')
+            send_start()
+            for chunk in itertools.chain((first,), chunks):
+                if chunk:
+                    send({'type': 'http.response.body', 'body': chunk,
+                          'more_body': True})
+            send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Django закрывает ответ сигналом request_finished, который
+            # закрывает соединения с базой этого потока.
+            if hasattr(response, 'close'):
+                response.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.executor.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
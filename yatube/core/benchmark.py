@@ -0,0 +1,142 @@
+"""Замеры страниц сайта через тестовый клиент Django.
+
+Каждый адрес запрашивается несколько раз; для него считаются медиана и
+95-й перцентиль времени ответа, число и время SQL-запросов и время
+отрисовки шаблона. Результат — словарь, который сохраняется в JSON и
+сравнивается с результатом прошлого запуска функцией ``compare``.
+"""
+import time
+from contextlib import contextmanager
+from statistics import median
+
+from django.db import connection, transaction
+from django.template.backends.django import Template
+from django.test import Client
+
+from .metrics import QueryTimer
+
+
+class RenderTimer:
+    """Считает время отрисовки шаблонов страницы.
+
+    Засекается только внешний шаблон: вложенные ``include`` и
+    ``extends`` входят в его время. Запросы, которые шаблон выполняет
+    при переборе ленивых QuerySet, тоже входят в это время.
+    """
+    def __init__(self):
+        self.seconds = 0.0
+        self.depth = 0
+
+    @contextmanager
+    def installed(self):
+        render = Template.render
+        timer = self
+
+        def timed_render(template, *args, **kwargs):
+            timer.depth += 1
+            started = time.perf_counter()
+            try:
+                return render(template, *args, **kwargs)
+            finally:
+                timer.depth -= 1
+                if not timer.depth:
+                    timer.seconds += time.perf_counter() - started
+
+        Template.render = timed_render
+        try:
+            yield self
+        finally:
+            Template.render = render
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def measure(client, url, data=None):
+    """Выполняет один запрос и возвращает его замеры.
+
+    Изменения в базе, сделанные запросом, откатываются, чтобы запросы
+    вроде подписки измерялись каждый раз в одинаковых условиях.
+    """
+    queries = QueryTimer()
+    renders = RenderTimer()
+    with transaction.atomic(), renders.installed(), \
+            connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        response = client.get(url, data)
+        elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return {
+        'status': response.status_code,
+        'ms': elapsed * 1000,
+        'queries': queries.count,
+        'query_ms': queries.seconds * 1000,
+        'render_ms': renders.seconds * 1000,
+    }
+
+
+def run(targets, repeat, warmup=1, before_request=None):
+    """Замеряет адреса и возвращает сводку по именам страниц.
+
+    ``targets`` — кортежи ``(имя, адрес, параметры GET, пользователь)``;
+    запросы от имени пользователя идут с выполненным входом.
+    ``before_request`` вызывается перед каждым замером, например чтобы
+    очистить кэш.
+    """
+    results = {}
+    for name, url, data, user in targets:
+        # Адрес вне INTERNAL_IPS, чтобы не включалась debug_toolbar.
+        client = Client(REMOTE_ADDR='192.0.2.1')
+        samples = []
+        for number in range(warmup + repeat):
+            # Вход перед каждым запросом: страница выхода его сбрасывает.
+            if user is not None:
+                client.force_login(user)
+            if before_request is not None:
+                before_request()
+            sample = measure(client, url, data)
+            if number >= warmup:
+                samples.append(sample)
+        timings = [sample['ms'] for sample in samples]
+        results[name] = {
+            'url': url,
+            'status': samples[-1]['status'],
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': round(median(
+                sample['queries'] for sample in samples)),
+            'query_ms': round(median(
+                sample['query_ms'] for sample in samples), 3),
+            'render_ms': round(median(
+                sample['render_ms'] for sample in samples), 3),
+        }
+    return results
+
+
+def compare(baseline, current, threshold, min_delta_ms=1.0):
+    """Возвращает описания регрессий относительно прошлого запуска.
+
+    Регрессия — медиана времени ответа, выросшая больше чем в
+    ``1 + threshold`` раз и больше чем на ``min_delta_ms``, или любое
+    увеличение числа SQL-запросов.
+    """
+    regressions = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        delta = result['p50_ms'] - before['p50_ms']
+        if (result['p50_ms'] > before['p50_ms'] * (1 + threshold)
+                and delta > min_delta_ms):
+            regressions.append(
+                f'{name}: p50 {before["p50_ms"]:.2f} -> '
+                f'{result["p50_ms"]:.2f} мс')
+        if result['queries'] > before['queries']:
+            regressions.append(
+                f'{name}: запросов {before["queries"]} -> '
+                f'{result["queries"]}')
+    return regressions
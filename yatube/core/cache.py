@@ -0,0 +1,180 @@
+"""Кэш страниц лент с версионированными ключами.
+
+Каждая лента (главная страница, подписки пользователя, посты автора)
+имеет в кэше свою версию. Страницы ленты кэшируются под ключом,
+включающим версию, поэтому для сброса ленты достаточно сменить
+версию — старые страницы просто перестают читаться и вытесняются по
+таймауту.
+
+Кроме версий, у лент есть отметки времени последнего изменения
+(``touch``), по которым считаются ETag и Last-Modified условных
+запросов, см. core.conditional.
+"""
+import copy
+import hashlib
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, routers
+from .paginator import paginator
+
+# Бэкенды, у которых у каждого процесса свой кэш.
+LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+# Счётчики попаданий и промахов по пространствам имён:
+# stats['feed', 'hit'], stats['profile', 'miss'] и т.д.
+stats = Counter()
+
+
+def count(namespace, outcome, number=1):
+    """Учитывает попадания или промахи кэша в stats и в замерах запроса."""
+    stats[namespace, outcome] += number
+    metrics.count_cache(outcome, number)
+
+
+def is_shared(alias='default'):
+    """Видят ли записи кэша alias другие процессы.
+
+    Версии и отметки лент меняют и веб-процессы, и воркер задач, поэтому
+    без общего кэша воркер сбрасывает ленты только у себя.
+    """
+    config = settings.CACHES[alias]
+    if config['BACKEND'] == 'core.cache_backends.TwoTierCache':
+        return is_shared(config.get('OPTIONS', {}).get('SHARED', 'shared'))
+    return config['BACKEND'] not in LOCAL_BACKENDS
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_version(scope):
+    """Возвращает текущую версию ленты, создавая её при отсутствии."""
+    return cache.get_or_set(version_key(scope), new_version, None)
+
+
+def bump(*scopes):
+    """Сбрасывает ленты, выдавая им новые версии."""
+    if scopes:
+        cache.set_many(
+            {version_key(scope): new_version() for scope in scopes}, None)
+        touch(*scopes)
+
+
+def changed_key(scope):
+    return f'changed:{scope}'
+
+
+def touch(*scopes):
+    """Отмечает изменение данных, не сбрасывая закэшированных страниц."""
+    if scopes:
+        now = time.time()
+        cache.set_many({changed_key(scope): now for scope in scopes}, None)
+
+
+def last_changed(*scopes):
+    """Возвращает отметки изменения по областям.
+
+    Вытесненная из кэша отметка заменяется текущим временем: клиент
+    лишний раз получит страницу целиком, но не устаревшую.
+    """
+    marks = cache.get_many([changed_key(scope) for scope in scopes])
+    now = time.time()
+    missing = {
+        changed_key(scope): now for scope in scopes
+        if changed_key(scope) not in marks
+    }
+    if missing:
+        cache.set_many(missing, None)
+        marks.update(missing)
+    return {scope: marks[changed_key(scope)] for scope in scopes}
+
+
+def new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def page_token(request):
+    """Нормализует параметры навигации для ключа кэша.
+
+    Номер страницы попадает в ключ как есть, чтобы страницу можно было
+    сбросить точечно; курсор хэшируется.
+    """
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return 'c' + hashlib.md5(cursor.encode()).hexdigest()
+    return f'p{page_number(request)}'
+
+
+def page_number(request):
+    """Возвращает номер запрошенной страницы, по умолчанию первой."""
+    try:
+        number = int(request.GET.get('page', 1))
+    except (TypeError, ValueError):
+        return 1
+    return number if number > 0 else 1
+
+
+def page_key(namespace, scope, token):
+    return f'{namespace}:{scope}:{get_version(scope)}:{token}'
+
+
+def delete_pages(namespace, scope, numbers):
+    """Сбрасывает отдельные страницы ленты, не меняя её версии."""
+    touch(scope)
+    version = get_version(scope)
+    cache.delete_many(
+        [f'{namespace}:{scope}:{version}:p{number}' for number in numbers])
+
+
+def detach(page_obj):
+    """Готовит страницу к сохранению в кэше.
+
+    Записи страницы материализуются в список, а у копии пагинатора
+    исходный QuerySet заменяется пустым, чтобы при сериализации не
+    выбиралась вся лента.
+    """
+    page_obj.object_list = list(page_obj.object_list)
+    paginator_copy = copy.copy(page_obj.paginator)
+    paginator_copy.object_list = paginator_copy.object_list.none()
+    page_obj.paginator = paginator_copy
+    return page_obj
+
+
+def cached_page(namespace, scope, request, get_records, timeout=None):
+    """Возвращает страницу ленты из кэша или собирает её заново.
+
+    ``get_records`` вызывается только при промахе, поэтому повторное
+    чтение ленты не обращается к базе данных.
+    """
+    token = page_token(request)
+    key = page_key(namespace, scope, token)
+    page_obj = cache.get(key)
+    if page_obj is not None:
+        count(namespace, 'hit')
+        return page_obj
+    count(namespace, 'miss')
+    page_obj = paginator(get_records(), request)
+    # Номер вне диапазона (?page=0, ?page=99) даёт последнюю страницу:
+    # под ключом запрошенного номера её хранить нельзя.
+    number = getattr(page_obj, 'number', None)
+    if number is not None and token != f'p{number}':
+        return page_obj
+    if not (routers.current_replica() and recently_changed(scope)):
+        cache.set(key, detach(page_obj), timeout)
+    return page_obj
+
+
+def recently_changed(*scopes):
+    """Одна из лент менялась недавно, и реплика может её ещё не знать.
+
+    Страница такой ленты, прочитанная с реплики, не кэшируется и не
+    получает ETag, иначе устаревшая страница жила бы в кэше весь
+    таймаут, а у клиента — до следующего изменения.
+    """
+    changed = max(last_changed(*scopes).values())
+    return changed > time.time() - settings.REPLICA_PIN_SECONDS
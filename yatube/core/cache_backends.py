@@ -0,0 +1,201 @@
+"""Двухуровневый кэш: локальный LRU процесса перед общим хранилищем.
+
+Чтение сначала идёт в небольшой LRU внутри процесса и только при промахе
+в общий кэш (memcached, файлы, база данных). Каждая запись и удаление
+публикуются в журнале инвалидаций в общем кэше; раз в ``SYNC_INTERVAL``
+секунд процесс читает журнал и вытесняет из своего LRU изменённые
+другими процессами ключи. Если журнал успел вытесниться, локальный
+уровень очищается целиком.
+
+Настройки в ``OPTIONS``:
+
+* ``SHARED`` — алиас общего кэша в ``settings.CACHES``;
+* ``MAX_ENTRIES`` — размер локального LRU;
+* ``LOCAL_TIMEOUT`` — сколько секунд запись живёт в локальном LRU;
+* ``SYNC_INTERVAL`` — как часто сверяться с журналом инвалидаций.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SEQUENCE_KEY = 'twotier:sequence'
+LOG_KEY = 'twotier:log:{}'
+# Отметка в журнале, по которой очищается весь локальный уровень.
+CLEAR = '*'
+# Сколько записей журнала читать за раз; при большем отставании
+# дешевле очистить локальный уровень.
+MAX_LOG_READ = 1000
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__({
+            'TIMEOUT': params.get('TIMEOUT', DEFAULT_TIMEOUT),
+            'KEY_PREFIX': params.get('KEY_PREFIX', ''),
+            'VERSION': params.get('VERSION', 1),
+            'KEY_FUNCTION': params.get('KEY_FUNCTION'),
+        })
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.max_entries = int(options.get('MAX_ENTRIES', 1000))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 60))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 1))
+        # Процесс, отставший от журнала дольше, очищает LRU целиком.
+        self.log_timeout = max(60, int(self.sync_interval * 10))
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = None
+        self._synced_at = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    # Локальный уровень.
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _local_set(self, key, value):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _local_clear(self):
+        with self._lock:
+            self._local.clear()
+
+    # Журнал инвалидаций.
+
+    def _publish(self, keys):
+        """Сообщает остальным процессам об изменённых ключах."""
+        self._local_delete(keys)
+        shared = self.shared
+        shared.add(SEQUENCE_KEY, 0, None)
+        sequence = shared.incr(SEQUENCE_KEY)
+        log_key = LOG_KEY.format(sequence)
+        if not shared.add(log_key, list(keys), self.log_timeout):
+            # Номер уже занят другим процессом: на неатомарных бэкендах
+            # incr может выдать его дважды. Сбрасываем всё.
+            shared.set(log_key, [CLEAR], self.log_timeout)
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        shared = self.shared
+        sequence = shared.get(SEQUENCE_KEY, 0)
+        if (self._sequence is None or sequence < self._sequence
+                or sequence - self._sequence > MAX_LOG_READ):
+            self._local_clear()
+        elif sequence > self._sequence:
+            log_keys = [LOG_KEY.format(number)
+                        for number in range(self._sequence + 1, sequence + 1)]
+            log = shared.get_many(log_keys)
+            if len(log) < len(log_keys):
+                self._local_clear()
+            else:
+                keys = [key for entry in log.values() for key in entry]
+                if CLEAR in keys:
+                    self._local_clear()
+                else:
+                    self._local_delete(keys)
+        self._sequence = sequence
+
+    # Интерфейс BaseCache. Ключи передаются в общий кэш без изменений,
+    # префикс и версию добавляет он сам.
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self.make_key(key, version)
+        entry = self._local_get(local_key)
+        if entry is not None:
+            return entry[1]
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found = {}
+        missing = []
+        for key in keys:
+            entry = self._local_get(self.make_key(key, version))
+            if entry is not None:
+                found[key] = entry[1]
+            else:
+                missing.append(key)
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._local_set(self.make_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._publish([self.make_key(key, version)])
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._publish([self.make_key(key, version)])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._publish([self.make_key(key, version) for key in data])
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._publish([self.make_key(key, version)])
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._publish([self.make_key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        if keys:
+            self.shared.delete_many(keys, version=version)
+            self._publish([self.make_key(key, version) for key in keys])
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def clear(self):
+        # Номер журнала переживает очистку, иначе другие процессы не
+        # заметят новых записей под уже прочитанными номерами.
+        sequence = self.shared.get(SEQUENCE_KEY, 0)
+        self.shared.clear()
+        self.shared.set(SEQUENCE_KEY, sequence, None)
+        self._publish([CLEAR])
+        self._local_clear()
@@ -0,0 +1,45 @@
+"""Условные GET-запросы для страниц лент и постов.
+
+ETag страницы считается по отметкам изменения её областей
+(``core.cache.touch``), которые ставят сигналы при любом изменении
+постов, комментариев, групп, подписок и пользователей. Если клиент
+прислал совпадающий ETag, ответ 304 отдаётся без запросов страницы и
+отрисовки шаблона.
+
+Last-Modified не отдаётся: он общий для всех пользователей и точен до
+секунды, поэтому по If-Modified-Since клиент получил бы 304 на страницу,
+отрисованную для другой сессии.
+"""
+import hashlib
+
+from django.conf import settings
+from django.views.decorators.http import condition
+
+from . import cache, routers
+
+
+def conditional(get_scopes):
+    """Декоратор view с проверкой ETag.
+
+    ``get_scopes(request, *args, **kwargs)`` возвращает области, от
+    которых зависит страница; для несуществующей страницы он
+    выбрасывает Http404.
+    """
+    def etag(request, *args, **kwargs):
+        scopes = get_scopes(request, *args, **kwargs)
+        # Страница с отстающей реплики получила бы ETag нового
+        # состояния, и клиент держал бы её до следующего изменения.
+        if routers.current_replica() and cache.recently_changed(*scopes):
+            return None
+        scope_marks = cache.last_changed(*scopes)
+        # Страница зависит и от того, кто её смотрит: шапка, кнопки
+        # подписки и правки, CSRF-токен форм.
+        parts = [
+            f'{scope}={mark!r}' for scope, mark in sorted(scope_marks.items())
+        ]
+        parts.append(f'user={request.user.pk}')
+        parts.append(
+            f'csrf={request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")}')
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    return condition(etag_func=etag)
@@ -0,0 +1,24 @@
+"""SQLite с настройками для работы под нагрузкой.
+
+Отличия от ``django.db.backends.sqlite3``:
+
+* при подключении выполняются PRAGMA из ключа ``PRAGMAS`` настроек
+  базы: WAL позволяет читать во время записи, ``busy_timeout`` —
+  ждать освободившейся блокировки вместо ошибки;
+* транзакции начинаются с ``BEGIN IMMEDIATE``. Обычный ``BEGIN``
+  берёт блокировку записи только на первой записи, и если другая
+  транзакция успела записать раньше, SQLite сразу отвечает
+  «database is locked», не дожидаясь ``busy_timeout``.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
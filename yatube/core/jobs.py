@@ -0,0 +1,201 @@
+"""Очередь фоновых задач в базе данных.
+
+Работа после записи, без которой можно ответить на запрос, —
+миниатюры картинок, удаление файлов, отправка почты — ставится в
+очередь вызовом ``задача.delay(*args)`` и выполняется воркером
+``manage.py run_jobs``.
+
+Задача записывается в той же транзакции, что и вызвавшее её
+изменение, поэтому попадает в очередь только вместе с ним. Воркер
+удаляет задачу после выполнения, и если он упал посреди работы, задача
+выполнится ещё раз, когда истечёт ``JOBS_LOCK_SECONDS``: доставка «хотя
+бы один раз», задачи должны быть идемпотентными. Задача с ошибкой
+повторяется с экспоненциальной задержкой, после ``JOBS_MAX_ATTEMPTS``
+попыток она помечается ``failed`` и остаётся в базе с текстом ошибки.
+Задача может сама отложить себя исключением ``Retry``, это не считается
+неудачной попыткой.
+
+При ``settings.JOBS_EAGER`` задачи выполняются без очереди, в том же
+потоке после фиксации транзакции; задачи ``task(background=True)``,
+которые ждут сети, как отправка почты, — в фоновом потоке процесса,
+чтобы не задерживать ответ. Отложенная через ``Retry`` задача при этом
+возвращается в очередь, и процесс сам выполнит её по таймеру.
+
+Без ``JOBS_EAGER`` воркеру нужен общий с веб-процессами кэш: задачи
+сохраняют посты, и сигналы сбрасывают версии лент в кэше воркера.
+"""
+import functools
+import json
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Фоновый поток для задач при JOBS_EAGER и таймеры отложенных задач.
+background = ThreadPoolExecutor(max_workers=1,
+                                thread_name_prefix='yatube-jobs')
+timers = set()
+
+
+class Retry(Exception):
+    """Выбрасывается задачей, чтобы повторить её через seconds секунд."""
+    def __init__(self, seconds):
+        super().__init__(seconds)
+        self.seconds = seconds
+
+
+def task(func=None, *, background=False):
+    """Декоратор функции задачи: ``func.delay(*args)`` ставит её в
+    очередь. Аргументы должны сериализоваться в JSON.
+
+    ``background=True`` — задача ждёт сети, и при ``JOBS_EAGER`` она
+    выполняется в фоновом потоке, а не в запросе.
+    """
+    if func is None:
+        return functools.partial(task, background=background)
+    func.delay = functools.partial(
+        enqueue, f'{func.__module__}.{func.__qualname__}', background)
+    return func
+
+
+def enqueue(name, in_background, *args):
+    args = json.dumps(args)
+    if not settings.JOBS_EAGER:
+        Job.objects.create(name=name, args=args)
+    elif in_background:
+        transaction.on_commit(
+            lambda: background.submit(in_thread, execute, name, args))
+    else:
+        transaction.on_commit(lambda: execute(name, args))
+
+
+def execute(name, args):
+    """Выполняет задачу без очереди, ошибку только пишет в журнал.
+
+    Отложенная задача возвращается в очередь и выполняется по таймеру.
+    """
+    try:
+        import_string(name)(*json.loads(args))
+    except Retry as retry:
+        logger.warning('Задача %s%s отложена на %s с', name, args,
+                       round(retry.seconds))
+        # Та же задача уже ждёт в очереди: второй копии не нужно.
+        if Job.objects.filter(name=name, args=args, failed=False,
+                              locked_until=None).exists():
+            return
+        Job.objects.create(
+            name=name, args=args,
+            run_after=timezone.now() + timedelta(seconds=retry.seconds))
+        run_later(retry.seconds)
+    except Exception:
+        logger.exception('Задача %s%s завершилась ошибкой', name, args)
+
+
+def in_thread(func, *args):
+    """Выполняет func в фоновом потоке с соединениями как у запроса."""
+    close_old_connections()
+    try:
+        func(*args)
+    finally:
+        close_old_connections()
+
+
+def run_later(seconds):
+    """Выполняет готовые задачи очереди через seconds секунд."""
+    def run():
+        timers.discard(timer)
+        background.submit(in_thread, run_pending)
+    timer = threading.Timer(seconds, run)
+    timer.daemon = True
+    timers.add(timer)
+    timer.start()
+
+
+def backoff(attempts):
+    """Задержка перед следующей попыткой: удваивается с каждой
+    неудачей, до ``JOBS_RETRY_MAX_DELAY`` секунд, со случайной
+    добавкой, чтобы упавшие вместе задачи не повторялись вместе."""
+    delay = min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+                settings.JOBS_RETRY_MAX_DELAY)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def due():
+    now = timezone.now()
+    return Job.objects.filter(failed=False, run_after__lte=now).filter(
+        Q(locked_until=None) | Q(locked_until__lt=now))
+
+
+def claim():
+    """Берёт самую раннюю готовую задачу или возвращает None."""
+    while True:
+        pk = due().order_by('run_after').values_list(
+            'pk', flat=True).first()
+        if pk is None:
+            return None
+        # Другой воркер мог взять задачу между выборкой и обновлением.
+        if due().filter(pk=pk).update(
+                locked_until=timezone.now() + timedelta(
+                    seconds=settings.JOBS_LOCK_SECONDS),
+                attempts=F('attempts') + 1):
+            return Job.objects.get(pk=pk)
+
+
+def run(job):
+    """Выполняет взятую задачу: удаляет её или откладывает повтор.
+
+    Возвращает True, если задача выполнена, False при ошибке и None,
+    если задача отложила себя сама.
+    """
+    jobs = Job.objects.filter(pk=job.pk)
+    try:
+        import_string(job.name)(*json.loads(job.args))
+    except Retry as retry:
+        jobs.update(
+            run_after=timezone.now() + timedelta(seconds=retry.seconds),
+            locked_until=None, attempts=F('attempts') - 1)
+        return None
+    except Exception:
+        error = traceback.format_exc()
+    else:
+        jobs.delete()
+        return True
+    if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+        logger.error('Задача %s исчерпала попытки:\n%s', job, error)
+        jobs.update(failed=True, locked_until=None, last_error=error)
+    else:
+        logger.warning('Задача %s будет повторена:\n%s', job, error)
+        jobs.update(run_after=timezone.now() + backoff(job.attempts),
+                    locked_until=None, last_error=error)
+    return False
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть, но не больше limit.
+
+    Возвращает число выполненных и число неудачных задач.
+    """
+    done = failed = taken = 0
+    while limit is None or taken < limit:
+        job = claim()
+        if job is None:
+            break
+        taken += 1
+        outcome = run(job)
+        if outcome:
+            done += 1
+        elif outcome is False:
+            failed += 1
+    return done, failed
@@ -0,0 +1,187 @@
+"""Спул исходящей почты.
+
+``SpoolBackend`` — бэкенд ``EMAIL_BACKEND``, который не отправляет
+письма, а сохраняет их в ``OutboundMail`` и ставит фоновую задачу
+``flush``. Запрос, отправляющий письмо (сброс пароля, уведомления),
+тратит на это одну вставку в базу.
+
+``flush`` отправляет письма пачками по ``MAIL_BATCH_SIZE`` через
+бэкенд ``MAIL_DELIVERY_BACKEND`` по одному соединению на весь запуск и
+не больше ``MAIL_RATE_PER_MINUTE`` писем в минуту на все воркеры:
+счётчик минуты хранится в базе (``MailRate``), а не в кэше, который у
+каждого процесса может быть свой.
+Письмо удаляется из спула после отправки; письмо, которое сервер
+отклонил, откладывается с растущей задержкой и после
+``JOBS_MAX_ATTEMPTS`` попыток помечается ``failed``. При обрыве
+соединения повторяется вся задача.
+"""
+import json
+import smtplib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import jobs
+from .models import Job, MailRate, OutboundMail
+
+# Ошибки, после которых соединение ещё годно: сервер отклонил письмо.
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError)
+
+
+class SpoolBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        mails = [
+            OutboundMail(
+                from_email=message.from_email,
+                recipients=json.dumps(message.recipients()),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        if mails:
+            OutboundMail.objects.bulk_create(mails)
+            schedule_flush()
+        return len(mails)
+
+
+class RawMessage:
+    """Готовое письмо в байтах для ``message()`` бэкендов Django."""
+    def __init__(self, data):
+        self.data = bytes(data)
+
+    def as_bytes(self, linesep='\n'):
+        return self.data.replace(b'\n', linesep.encode())
+
+    def get_charset(self):
+        return None
+
+
+class SpooledMessage:
+    """Письмо из спула с интерфейсом EmailMessage, нужным бэкендам."""
+    encoding = None
+
+    def __init__(self, mail):
+        self.mail = mail
+        self.from_email = mail.from_email
+
+    def recipients(self):
+        return json.loads(self.mail.recipients)
+
+    def message(self):
+        return RawMessage(self.mail.message)
+
+
+def schedule_flush():
+    """Ставит отправку спула, если она ещё не ждёт в очереди.
+
+    Уже работающая отправка могла не увидеть новых писем, поэтому
+    учитываются только не взятые воркером задачи. Отложенная отправка
+    переносится на сейчас, чтобы новое письмо не ждало её срока. При
+    ``JOBS_EAGER`` очередь никто не опрашивает, отправка ставится всегда.
+    """
+    if settings.JOBS_EAGER or not Job.objects.filter(
+            name=FLUSH, failed=False, locked_until=None).update(
+                run_after=timezone.now()):
+        flush.delay()
+
+
+def allowance(count):
+    """Сколько из count писем можно отправить в текущую минуту.
+
+    Разрешённые письма сразу учитываются в счётчике минуты; строка
+    счётчика блокируется до конца транзакции, поэтому воркеры не
+    превысят лимит вместе.
+    """
+    minute = int(time.time() // 60)
+    with transaction.atomic():
+        MailRate.objects.filter(minute__lt=minute).delete()
+        MailRate.objects.get_or_create(minute=minute)
+        rate = MailRate.objects.select_for_update().get(minute=minute)
+        allowed = max(0, min(count,
+                             settings.MAIL_RATE_PER_MINUTE - rate.sent))
+        if allowed:
+            MailRate.objects.filter(pk=rate.pk).update(
+                sent=F('sent') + allowed)
+    return allowed
+
+
+def claim(size):
+    """Берёт до size писем из спула для этого запуска отправки."""
+    now = timezone.now()
+    free = OutboundMail.objects.filter(failed=False).filter(
+        Q(locked_until=None) | Q(locked_until__lt=now))
+    token = uuid.uuid4().hex
+    pks = list(free.order_by('pk').values_list('pk', flat=True)[:size])
+    free.filter(pk__in=pks).update(
+        claimed_by=token,
+        locked_until=now + timedelta(seconds=settings.JOBS_LOCK_SECONDS))
+    return list(OutboundMail.objects.filter(claimed_by=token).order_by('pk'))
+
+
+def release(mails):
+    OutboundMail.objects.filter(
+        pk__in=[mail.pk for mail in mails]).update(locked_until=None)
+
+
+def deliver(connection, mails):
+    """Отправляет взятые письма по открытому соединению.
+
+    Письмо, которое сервер отклонил, откладывается с растущей
+    задержкой; возвращается самая ранняя из них или None. При обрыве
+    соединения остальные письма возвращаются в спул.
+    """
+    retry_in = None
+    for number, mail in enumerate(mails):
+        try:
+            connection.send_messages([SpooledMessage(mail)])
+        except MESSAGE_ERRORS as error:
+            attempts = mail.attempts + 1
+            delay = jobs.backoff(attempts)
+            OutboundMail.objects.filter(pk=mail.pk).update(
+                attempts=attempts, last_error=repr(error),
+                failed=attempts >= settings.JOBS_MAX_ATTEMPTS,
+                locked_until=timezone.now() + delay)
+            if attempts < settings.JOBS_MAX_ATTEMPTS:
+                retry_in = min(retry_in or delay, delay)
+            continue
+        except Exception:
+            release(mails[number:])
+            raise
+        OutboundMail.objects.filter(pk=mail.pk).delete()
+    return retry_in
+
+
+@jobs.task(background=True)
+def flush():
+    """Отправляет спул пачками по одному соединению."""
+    if not OutboundMail.objects.filter(failed=False).exists():
+        return
+    retry_in = None
+    connection = get_connection(settings.MAIL_DELIVERY_BACKEND,
+                                fail_silently=False)
+    with connection:
+        while True:
+            mails = claim(settings.MAIL_BATCH_SIZE)
+            if not mails:
+                break
+            allowed = allowance(len(mails))
+            release(mails[allowed:])
+            delay = deliver(connection, mails[:allowed])
+            if delay is not None:
+                retry_in = min(retry_in or delay, delay)
+            if allowed < len(mails):
+                # Лимит минуты исчерпан: продолжим в следующую.
+                raise jobs.Retry(60 - time.time() % 60)
+    if retry_in is not None:
+        raise jobs.Retry(retry_in.total_seconds())
+
+
+FLUSH = f'{flush.__module__}.{flush.__qualname__}'
@@ -0,0 +1,211 @@
+import asyncio
+import io
+import threading
+import time
+from contextlib import ExitStack
+from itertools import cycle
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.asgi import WSGIToASGI, build_environ
+from core.benchmark import percentile
+from posts.models import Group, Post, User
+
+
+def with_latency(application, seconds):
+    """WSGI-приложение, у которого каждый SQL-запрос дольше на seconds."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def wrapper(environ, start_response):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(delay))
+            return application(environ, start_response)
+    return wrapper if seconds else application
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность страниц лент под WSGI и '
+            'ASGI при одновременных запросах. WSGI — один синхронный '
+            'воркер: запросы ждут друг друга. ASGI — yatube.asgi в одном '
+            'процессе с пулом из --threads потоков. Клиенты обращаются к '
+            'приложению напрямую, без сети, на текущей базе; запросы '
+            'только читают. --query-latency-ms добавляет задержку к '
+            'каждому SQL-запросу, как у базы данных по сети.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='Числа одновременных клиентов через '
+                                 'запятую.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждый замер.')
+        parser.add_argument('--threads', type=int,
+                            default=settings.ASGI_THREADS)
+        parser.add_argument('--query-latency-ms', type=float, default=0.0)
+        parser.add_argument('--username',
+                            help='Пользователь для ленты подписок; без '
+                                 'него лента не запрашивается.')
+
+    def handle(self, *args, **options):
+        login = Client()
+        if options['username']:
+            login.force_login(
+                User.objects.get(username=options['username']))
+        try:
+            # Задержка запросов не должна попадать в журнал медленных.
+            with override_settings(DEBUG=False,
+                                   SLOW_QUERY_MS=float('inf')):
+                self.compare(options, self.targets(options),
+                             login.cookies.output(header='', sep=';'))
+        finally:
+            login.logout()
+
+    def targets(self, options):
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('В базе нет постов, '
+                               'запустите manage.py seed_yatube.')
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=(post.author.username,)),
+        ]
+        group = Group.objects.annotate(
+            count=Count('posts')).order_by('-count').first()
+        if group is not None:
+            urls.append(reverse('posts:group_posts', args=(group.slug,)))
+        if options['username']:
+            urls.append(reverse('posts:follow_index'))
+        return urls
+
+    def compare(self, options, urls, cookie):
+        wsgi = with_latency(get_wsgi_application(),
+                            options['query_latency_ms'] / 1000)
+        asgi = WSGIToASGI(wsgi, options['threads'])
+        servers = {
+            'wsgi': (self.run_wsgi, wsgi),
+            'asgi': (self.run_asgi, asgi),
+        }
+        scopes = [self.scope(url, cookie) for url in urls]
+        self.stdout.write(
+            f'{"сервер":<8}{"клиенты":>9}{"запросов/с":>12}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"ошибок":>9}')
+        try:
+            for clients in map(int, options['concurrency'].split(',')):
+                for server, (run, application) in servers.items():
+                    # Прогрев: кэш страниц и соединения с базой.
+                    run(application, scopes, clients, len(scopes))
+                    started = time.perf_counter()
+                    timings, errors = run(
+                        application, scopes, clients, options['requests'])
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'{server:<8}{clients:>9}'
+                        f'{len(timings) / elapsed:>12.1f}'
+                        f'{percentile(timings, 50) * 1000:>10.1f}'
+                        f'{percentile(timings, 95) * 1000:>10.1f}'
+                        f'{errors:>9}')
+        finally:
+            asgi.executor.shutdown()
+
+    def scope(self, url, cookie):
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': url,
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'localhost'),
+                        (b'cookie', cookie.encode('latin-1'))],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+
+    def run_wsgi(self, application, scopes, clients, total):
+        """Клиенты-потоки по очереди занимают единственный воркер."""
+        worker = threading.Lock()
+        lock = threading.Lock()
+        queue = cycle(scopes)
+        left = [total]
+        timings = []
+        errors = [0]
+
+        def client():
+            while True:
+                with lock:
+                    if not left[0]:
+                        return
+                    left[0] -= 1
+                    scope = next(queue)
+                started = time.perf_counter()
+                with worker:
+                    status = self.call_wsgi(application, scope)
+                with lock:
+                    timings.append(time.perf_counter() - started)
+                    errors[0] += status >= 400
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors[0]
+
+    def call_wsgi(self, application, scope):
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split(' ', 1)[0]))
+
+        response = application(
+            build_environ(scope, io.BytesIO()), start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return statuses[-1]
+
+    def run_asgi(self, application, scopes, clients, total):
+        """Клиенты-задачи обращаются к ASGI-приложению одновременно."""
+        queue = cycle(scopes)
+        left = [total]
+        timings = []
+        errors = [0]
+
+        async def request(scope):
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await application(scope, receive, send)
+            return statuses[0]
+
+        async def client():
+            while left[0]:
+                left[0] -= 1
+                started = time.perf_counter()
+                status = await request(next(queue))
+                timings.append(time.perf_counter() - started)
+                errors[0] += status >= 400
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(clients)))
+
+        asyncio.run(main())
+        return timings, errors[0]
@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from core.paginator import CursorPaginator
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает первую и глубокую страницы при постраничной '
+            'навигации по номеру и по курсору. Записи создаются внутри '
+            'транзакции и откатываются по окончании замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--page', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['posts'], options['batch_size'])
+                self.run(options['page'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, batch_size):
+        author = User.objects.create_user(username='bench_paginator')
+        self.stdout.write(f'Создаём {count} постов...')
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            Post.objects.bulk_create(
+                Post(text=f'Пост {offset + i}', author=author)
+                for i in range(size)
+            )
+        self.stdout.write(f'Готово за {time.perf_counter() - started:.1f} с')
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    def run(self, deep_page, repeat):
+        per_page = settings.LIMIT_VIEWS
+        posts = Post.objects.all()
+        offset = Paginator(posts, per_page)
+        cursor = CursorPaginator(posts, per_page)
+        deep_page = min(deep_page, offset.num_pages)
+        # Курсор глубокой страницы указывает на последнюю запись
+        # предыдущей страницы, поэтому берём её заранее.
+        deep_cursor = None
+        if deep_page > 1:
+            last = posts.order_by('-pub_date', '-pk')[
+                (deep_page - 1) * per_page - 1]
+            deep_cursor = cursor.encode_cursor(last, 'n')
+
+        def offset_page(number):
+            def func():
+                paginator = Paginator(posts, per_page)
+                list(paginator.page(number))
+            return func
+
+        def cursor_page(token):
+            return lambda: list(cursor.page(token))
+
+        rows = (
+            ('offset', 1, offset_page(1)),
+            ('offset', deep_page, offset_page(deep_page)),
+            ('cursor', 1, cursor_page(None)),
+            ('cursor', deep_page, cursor_page(deep_cursor)),
+        )
+        self.stdout.write(f'{"режим":<8}{"страница":>10}{"мс":>12}')
+        for mode, number, func in rows:
+            self.stdout.write(
+                f'{mode:<8}{number:>10}{self.measure(func, repeat):>12.2f}')
@@ -0,0 +1,153 @@
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+# Настройки базы по умолчанию и настройки из settings.DATABASES.
+PROFILES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+    },
+    'tuned': {
+        'ENGINE': 'core.db_backends.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'PRAGMAS': settings.SQLITE_PRAGMAS,
+    },
+}
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'pub_date REAL, text TEXT, comments_count INTEGER DEFAULT 0)',
+    'CREATE INDEX bench_post_author ON bench_post (author_id, pub_date)',
+    'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT)',
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite с настройками по '
+            'умолчанию и с настройками проекта (WAL, PRAGMA, BEGIN '
+            'IMMEDIATE, постоянные соединения) при чтении и записи из '
+            'нескольких потоков. Каждая итерация потока — как запрос: '
+            'лента автора или комментарий с обновлением счётчика. Базы '
+            'создаются во временном каталоге.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,2,4,8',
+                            help='Числа потоков через запятую.')
+        parser.add_argument('--seconds', type=float, default=3.0,
+                            help='Длительность замера для числа потоков.')
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Доля запросов на запись.')
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--authors', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+        self.options = options
+        threads = [int(number) for number in options['threads'].split(',')]
+        self.stdout.write(
+            f'{"профиль":<10}{"потоки":>8}{"чтений/с":>12}'
+            f'{"записей/с":>12}{"ошибок":>9}')
+        try:
+            for profile, database in PROFILES.items():
+                alias = f'bench_{profile}'
+                connections.databases[alias] = dict(
+                    database, NAME=f'{directory}/{profile}.sqlite3')
+                try:
+                    self.seed(alias)
+                    for count in threads:
+                        reads, writes, errors = self.run(alias, count)
+                        self.stdout.write(
+                            f'{profile:<10}{count:>8}{reads:>12.0f}'
+                            f'{writes:>12.0f}{errors:>9}')
+                finally:
+                    connections[alias].close()
+                    del connections.databases[alias]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def seed(self, alias):
+        rng = random.Random(0)
+        now = time.time()
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                for statement in SCHEMA:
+                    cursor.execute(statement)
+                cursor.executemany(
+                    'INSERT INTO bench_post (author_id, pub_date, text) '
+                    'VALUES (%s, %s, %s)',
+                    [(rng.randrange(self.options['authors']),
+                      now - rng.random() * 86400 * 365, f'Пост {number}')
+                     for number in range(self.options['posts'])])
+
+    def run(self, alias, count):
+        """Возвращает чтения и записи в секунду и число ошибок."""
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + self.options['seconds']
+        workers = [
+            threading.Thread(
+                target=self.work,
+                args=(alias, deadline, random.Random(number), totals, lock))
+            for number in range(count)
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        return (totals['reads'] / elapsed, totals['writes'] / elapsed,
+                totals['errors'])
+
+    def work(self, alias, deadline, rng, totals, lock):
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        connection = connections[alias]
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    if rng.random() < self.options['write_ratio']:
+                        self.write(alias, rng)
+                        counts['writes'] += 1
+                    else:
+                        self.read(alias, rng)
+                        counts['reads'] += 1
+                except OperationalError:
+                    counts['errors'] += 1
+                # Как по окончании HTTP-запроса: при CONN_MAX_AGE = 0
+                # соединение закрывается.
+                connection.close_if_unusable_or_obsolete()
+        finally:
+            connection.close()
+        with lock:
+            for key, value in counts.items():
+                totals[key] += value
+
+    def read(self, alias, rng):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT id, text, comments_count FROM bench_post '
+                'WHERE author_id = %s ORDER BY pub_date DESC LIMIT 10',
+                [rng.randrange(self.options['authors'])])
+            cursor.fetchall()
+
+    def write(self, alias, rng):
+        post_id = rng.randrange(1, self.options['posts'] + 1)
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                # Чтение перед записью, как у add_comment.
+                cursor.execute(
+                    'SELECT id FROM bench_post WHERE id = %s', [post_id])
+                cursor.fetchone()
+                cursor.execute(
+                    'INSERT INTO bench_comment (post_id, text) '
+                    'VALUES (%s, %s)', [post_id, 'Комментарий'])
+                cursor.execute(
+                    'UPDATE bench_post SET comments_count = '
+                    'comments_count + 1 WHERE id = %s', [post_id])
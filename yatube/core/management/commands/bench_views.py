@@ -0,0 +1,143 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment)
+from django.urls import reverse
+
+from about import urls as about_urls
+from core import benchmark
+from posts import urls as posts_urls
+from posts.models import Group, Post, Stats, User
+from users import urls as users_urls
+
+URL_MODULES = (posts_urls, users_urls, about_urls)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замеряет все страницы posts, users и about через тестовый '
+            'клиент на текущей базе: время ответа (p50, p95), число и '
+            'время SQL-запросов, время отрисовки шаблона. Результат '
+            'пишется в JSON и сравнивается с прошлым запуском. Изменения '
+            'в базе откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='Куда записать JSON.')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого запуска для сравнения.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост медианы времени ответа, доля.')
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Рост медианы меньше этого не считается регрессией.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Запрашивать страницы без входа.')
+        parser.add_argument('--username',
+                            help='Пользователь, от имени которого идут '
+                                 'запросы; по умолчанию самый '
+                                 'подписанный.')
+        parser.add_argument('--query', help='Запрос для страницы поиска.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['views']
+        # Как в тестах: DEBUG выключен, письма не отправляются.
+        try:
+            setup_test_environment(debug=False)
+        except RuntimeError:
+            environment = False
+        else:
+            environment = True
+        try:
+            with transaction.atomic():
+                views = benchmark.run(
+                    self.targets(options), options['repeat'],
+                    options['warmup'],
+                    cache.clear if options['cold'] else None)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if environment:
+                teardown_test_environment()
+        report = {
+            'options': {key: options[key] for key in (
+                'repeat', 'warmup', 'cold', 'anonymous')},
+            'views': views,
+        }
+        self.print_table(views, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+                file.write('\n')
+        if baseline is not None:
+            regressions = benchmark.compare(
+                baseline, views, options['threshold'],
+                options['min_delta_ms'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+
+    def targets(self, options):
+        """Адреса всех страниц с параметрами из текущей базы."""
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            stats = Stats.objects.order_by('-following_count').first()
+            user = stats.user if stats else User.objects.first()
+        if user is None:
+            raise CommandError('В базе нет пользователей, '
+                               'запустите manage.py seed_yatube.')
+        post = (Post.objects.filter(author=user).first()
+                or Post.objects.first())
+        if post is None:
+            raise CommandError('В базе нет постов, '
+                               'запустите manage.py seed_yatube.')
+        group = Group.objects.annotate(
+            count=Count('posts')).order_by('-count').first()
+        kwargs = {
+            'username': post.author.username,
+            'post_id': post.pk,
+            'slug': group.slug if group else 'none',
+        }
+        extra = {
+            'posts:search': {
+                'q': options['query'] or post.text.split()[0]},
+        }
+        login = None if options['anonymous'] else user
+        targets = []
+        for module in URL_MODULES:
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                url = reverse(name, kwargs={
+                    key: kwargs[key] for key in pattern.pattern.converters})
+                targets.append((name, url, extra.get(name), login))
+        return targets
+
+    def print_table(self, views, baseline):
+        self.stdout.write(
+            f'{"страница":<28}{"код":>5}{"p50":>10}{"p95":>10}'
+            f'{"запросы":>9}{"SQL, мс":>10}{"шаблон":>10}{"было p50":>10}')
+        for name, result in views.items():
+            before = (baseline or {}).get(name)
+            was = f'{before["p50_ms"]:.2f}' if before else '-'
+            self.stdout.write(
+                f'{name:<28}{result["status"]:>5}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["queries"]:>9}'
+                f'{result["query_ms"]:>10.2f}{result["render_ms"]:>10.2f}'
+                f'{was:>10}')
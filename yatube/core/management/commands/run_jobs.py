@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import cache, jobs
+
+
+class Command(BaseCommand):
+    help = ('Воркер очереди фоновых задач: выполняет готовые задачи и '
+            'опрашивает очередь каждые --interval секунд. Воркеров '
+            'можно запускать несколько, задача достаётся одному из них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить готовые задачи и выйти.')
+        parser.add_argument('--interval', type=float,
+                            default=settings.JOBS_POLL_SECONDS)
+
+    def handle(self, *args, **options):
+        if not cache.is_shared():
+            # Задачи меняют посты, а сбросы кэша лент из воркера не
+            # дойдут до веб-процессов.
+            raise CommandError(
+                'Воркеру нужен общий с веб-процессами кэш (YATUBE_CACHE='
+                'file, db или memcached). С кэшем locmem задачи '
+                'выполняются в запросе: YATUBE_JOBS_EAGER=1.')
+        try:
+            while True:
+                done, failed = jobs.run_pending()
+                if done or failed:
+                    self.stdout.write(
+                        f'Выполнено задач: {done}, с ошибками: {failed}')
+                if options['once']:
+                    return
+                # Как после запроса: соединение старше CONN_MAX_AGE
+                # закрывается.
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,158 @@
+"""Замеры запросов для TimingMiddleware.
+
+Во время запроса в потоке лежит ``RequestMetrics``: в него пишут
+обёртка SQL-запросов, обёртка отрисовки шаблонов и кэш страниц и
+карточек. По завершении запроса замеры попадают в гистограммы по
+имени view, которые живут в памяти процесса и отдаются страницей
+``/metrics/``.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.template.backends.django import Template
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_local = threading.local()
+_lock = threading.Lock()
+histograms = {}
+
+
+class QueryTimer:
+    """Считает SQL-запросы и их суммарное время.
+
+    Подключается через ``connection.execute_wrapper``.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = QueryTimer()
+        self.render_seconds = 0.0
+        self.render_depth = 0
+        self.cache = Counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def collect():
+    metrics = RequestMetrics()
+    _local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = None
+
+
+def count_cache(outcome, count=1):
+    """Учитывает попадание (hit) или промах (miss) кэша в запросе."""
+    metrics = current()
+    if metrics is not None and count:
+        metrics.cache[outcome] += count
+
+
+def install_render_timer():
+    """Подменяет отрисовку шаблонов на замеряющую, один раз.
+
+    Засекается только внешний шаблон: вложенные шаблоны, в том числе
+    карточки из ``render_to_string``, входят в его время.
+    """
+    render = Template.render
+    if getattr(render, 'timed', False):
+        return
+
+    def timed_render(template, *args, **kwargs):
+        metrics = current()
+        if metrics is None:
+            return render(template, *args, **kwargs)
+        metrics.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(template, *args, **kwargs)
+        finally:
+            metrics.render_depth -= 1
+            if not metrics.render_depth:
+                metrics.render_seconds += time.perf_counter() - started
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+def observe(view_name, metrics):
+    """Добавляет замеры запроса в гистограмму view."""
+    elapsed_ms = metrics.elapsed * 1000
+    with _lock:
+        histogram = histograms.setdefault(view_name, {
+            'count': 0,
+            'sum_ms': 0.0,
+            'db_ms': 0.0,
+            'queries': 0,
+            'render_ms': 0.0,
+            'cache': Counter(),
+            'buckets': [0] * len(BUCKETS),
+        })
+        histogram['count'] += 1
+        histogram['sum_ms'] += elapsed_ms
+        histogram['db_ms'] += metrics.queries.seconds * 1000
+        histogram['queries'] += metrics.queries.count
+        histogram['render_ms'] += metrics.render_seconds * 1000
+        histogram['cache'].update(metrics.cache)
+        for index, bound in enumerate(BUCKETS):
+            if elapsed_ms <= bound:
+                histogram['buckets'][index] += 1
+                break
+
+
+def snapshot():
+    """Копия гистограмм для отдачи наружу.
+
+    Корзины накопительные, как в Prometheus: в корзину ``le`` попадают
+    все запросы не дольше ``le`` миллисекунд.
+    """
+    with _lock:
+        views = {}
+        for name, histogram in histograms.items():
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(BUCKETS, histogram['buckets']):
+                cumulative += count
+                buckets['+Inf' if bound == float('inf') else bound] = (
+                    cumulative)
+            views[name] = {
+                'count': histogram['count'],
+                'sum_ms': round(histogram['sum_ms'], 3),
+                'db_ms': round(histogram['db_ms'], 3),
+                'queries': histogram['queries'],
+                'render_ms': round(histogram['render_ms'], 3),
+                'cache': dict(histogram['cache']),
+                'buckets': buckets,
+            }
+    return views
+
+
+def reset():
+    with _lock:
+        histograms.clear()
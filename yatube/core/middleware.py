@@ -0,0 +1,109 @@
+import json
+import logging
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+from .querylog import QueryLog, logger as query_logger
+
+logger = logging.getLogger('yatube.requests')
+
+
+class TimingMiddleware:
+    """Замеряет каждый запрос без debug_toolbar.
+
+    Время ответа, время и число SQL-запросов, время отрисовки шаблонов
+    и попадания в кэш отдаются в заголовке ``Server-Timing``, пишутся
+    строкой JSON в журнал ``yatube.requests`` и копятся в гистограммах
+    по view, см. ``core.metrics``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.install_render_timer()
+
+    def __call__(self, request):
+        with metrics.collect() as current, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(current.queries))
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        total_ms = current.elapsed * 1000
+        db_ms = current.queries.seconds * 1000
+        render_ms = current.render_seconds * 1000
+        response['Server-Timing'] = ', '.join((
+            f'total;dur={total_ms:.1f}',
+            f'db;dur={db_ms:.1f};desc="{current.queries.count} queries"',
+            f'render;dur={render_ms:.1f}',
+            f'cache;desc="hit={current.cache["hit"]} '
+            f'miss={current.cache["miss"]}"',
+        ))
+        metrics.observe(view_name, current)
+        level = (logging.WARNING if total_ms >= settings.SLOW_REQUEST_MS
+                 else logging.INFO)
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 3),
+                'db_ms': round(db_ms, 3),
+                'queries': current.queries.count,
+                'render_ms': round(render_ms, 3),
+                'cache_hits': current.cache['hit'],
+                'cache_misses': current.cache['miss'],
+            }, ensure_ascii=False))
+        return response
+
+
+class QueryLogMiddleware:
+    """Пишет медленные SQL-запросы и ищет N+1, см. ``core.querylog``.
+
+    Отчёт запроса сохраняется в ``response.query_log``, чтобы тесты
+    могли проверить, что страница обходится без N+1.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log = QueryLog()
+        request.query_log = log
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(log))
+            response = self.get_response(request)
+        for pattern in log.nplusone:
+            query_logger.warning(json.dumps(
+                {'view': log.view_name, 'nplusone': pattern},
+                ensure_ascii=False))
+        response.query_log = log
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_log.view_name = request.resolver_match.view_name
+
+
+class ReplicaPinMiddleware:
+    """После записи ставит куку чтения с основной базы, см. core.routers.
+
+    Кука живёт ``REPLICA_PIN_SECONDS`` — дольше, чем реплика догоняет
+    основную базу, поэтому после редиректа с формы или ссылки подписки
+    пользователь видит свой пост, комментарий или подписку.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.DATABASE_REPLICAS
+                and routers.writes(request)
+                and response.status_code < 400):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
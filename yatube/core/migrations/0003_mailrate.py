@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outboundmail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.BigIntegerField(unique=True)),
+                ('sent', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
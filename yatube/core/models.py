@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, см. core.jobs.
+
+    ``name`` — путь к функции задачи, ``args`` — JSON со списком
+    аргументов. Выполненная задача удаляется, исчерпавшая попытки
+    остаётся с ``failed`` и текстом последней ошибки.
+    """
+    name = models.CharField(max_length=200)
+    args = models.TextField(default='[]')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Задачу взял воркер; если он упал, после этого срока её возьмёт
+    # другой.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['failed', 'run_after'],
+                         name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}{self.args}'
+
+
+class OutboundMail(models.Model):
+    """Письмо в спуле исходящей почты, см. core.mail.
+
+    ``message`` — письмо целиком, как его отправит SMTP, ``recipients``
+    — JSON со списком адресов конверта.
+    """
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField()
+    message = models.BinaryField()
+    attempts = models.PositiveIntegerField(default=0)
+    # Письмо взял воркер, см. Job.locked_until.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.from_email} -> {self.recipients}'
+
+
+class MailRate(models.Model):
+    """Сколько писем отправлено за минуту ``minute`` (минуты от эпохи),
+    общий счётчик лимита ``MAIL_RATE_PER_MINUTE`` для всех воркеров."""
+    minute = models.BigIntegerField(unique=True)
+    sent = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.minute}: {self.sent}'
@@ -1,9 +1,151 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
 from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
 
+def paginator(records, request, cursor=None):
+    """Возвращает страницу записей по параметрам запроса.
 
-def paginator(records, request):
+    По умолчанию используется постраничная навигация по номеру
+    (``?page=``). Если включён ``settings.CURSOR_PAGINATION`` или передан
+    ``cursor=True``, используется навигация по курсору (``?cursor=``)
+    без подсчёта общего числа записей.
+    """
+    if cursor is None:
+        cursor = settings.CURSOR_PAGINATION
+    if cursor:
+        return CursorPaginator(records, settings.LIMIT_VIEWS).get_page(
+            request.GET.get('cursor'))
     paginator = Paginator(records, settings.LIMIT_VIEWS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPaginator:
+    """Постраничная навигация по ключу ``(pub_date, id)``.
+
+    Вместо ``OFFSET`` страница выбирается условием на ключ последней
+    записи предыдущей страницы, поэтому стоимость запроса не зависит
+    от глубины страницы, а ``COUNT(*)`` не выполняется вовсе.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field).isoformat()
+        raw = f'{direction}|{value}|{obj.pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, value, pk = raw.split('|')
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p') or value is None:
+            raise InvalidCursor(cursor)
+        return direction, value, pk
+
+    def page(self, cursor=None):
+        """Возвращает страницу после (или до) записи из курсора."""
+        field = self.field
+        if not cursor:
+            records = self.object_list.order_by(f'-{field}', '-pk')
+            rows = list(records[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+        direction, value, pk = self.decode_cursor(cursor)
+        if direction == 'n':
+            records = self.object_list.filter(
+                Q(**{f'{field}__lt': value}) | Q(pk__lt=pk),
+                **{f'{field}__lte': value},
+            ).order_by(f'-{field}', '-pk')
+            rows = list(records[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self,
+                has_next=len(rows) > self.per_page,
+                has_previous=True,
+            )
+        records = self.object_list.filter(
+            Q(**{f'{field}__gt': value}) | Q(pk__gt=pk),
+            **{f'{field}__gte': value},
+        ).order_by(field, 'pk')
+        rows = list(records[:self.per_page + 1])
+        return CursorPage(
+            rows[:self.per_page][::-1], self,
+            has_next=True,
+            has_previous=len(rows) > self.per_page,
+        )
+
+    def get_page(self, cursor=None):
+        """Как ``page()``, но с первой страницей при битом курсоре."""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CursorPage:
+    """Страница курсорной навигации.
+
+    Повторяет ту часть интерфейса ``django.core.paginator.Page``,
+    которой пользуются шаблоны, и добавляет курсоры соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'n')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'p')
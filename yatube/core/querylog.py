@@ -0,0 +1,119 @@
+"""Журнал медленных SQL-запросов и поиск N+1.
+
+``QueryLog`` подключается через ``connection.execute_wrapper`` на время
+запроса (см. ``QueryLogMiddleware``). Запросы дольше
+``settings.SLOW_QUERY_MS`` пишутся в журнал ``yatube.queries`` вместе
+с именем view и строкой шаблона или кода, откуда они выполнены.
+Одинаковые по форме SELECT, выполненные в одном запросе с
+``settings.NPLUSONE_THRESHOLD`` и больше разными параметрами, считаются
+признаком N+1: обычно это обращение к связанному объекту в цикле
+шаблона. Повтор с теми же параметрами — лишний, но не N+1 запрос.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger('yatube.queries')
+
+NUMBER_RE = re.compile(r'\b\d+\b')
+IN_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+TEMPLATE_RENDER = os.path.join('django', 'template', 'base.py')
+# Код проекта, в отличие от Django и сторонних пакетов.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Обёртки запросов, которые не могут быть местом вызова.
+WRAPPERS = tuple(
+    os.path.join(PROJECT_DIR, 'core', name)
+    for name in ('querylog.py', 'metrics.py', 'middleware.py',
+                 'benchmark.py'))
+
+
+def shape(sql):
+    """Форма запроса: без чисел и с одним %s вместо списка в IN."""
+    return IN_LIST_RE.sub('(%s...)', NUMBER_RE.sub('?', sql))
+
+
+def location():
+    """Строка шаблона или кода проекта, выполнившая запрос."""
+    frame = sys._getframe(1)
+    code_line = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (frame.f_code.co_name == 'render_annotated'
+                and filename.endswith(TEMPLATE_RENDER)):
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        if (code_line is None and filename.startswith(PROJECT_DIR)
+                and filename not in WRAPPERS
+                and 'site-packages' not in filename):
+            code_line = (f'{os.path.relpath(filename, PROJECT_DIR)}:'
+                         f'{frame.f_lineno}')
+        frame = frame.f_back
+    return code_line
+
+
+class QueryLog:
+    """Запросы одного HTTP-запроса, сгруппированные по форме."""
+    def __init__(self, view_name=None):
+        self.view_name = view_name
+        self.count = 0
+        self.shapes = Counter()
+        self.params = defaultdict(set)
+        self.locations = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, (time.perf_counter() - started) * 1000,
+                        params)
+
+    def record(self, sql, duration_ms, params=None):
+        self.count += 1
+        if duration_ms >= settings.SLOW_QUERY_MS:
+            slow = {
+                'view': self.view_name,
+                'ms': round(duration_ms, 3),
+                'sql': sql[:1000],
+                'location': location(),
+            }
+            self.slow.append(slow)
+            logger.warning(json.dumps(slow, ensure_ascii=False))
+        if sql.lstrip()[:6].upper() != 'SELECT':
+            return
+        query_shape = shape(sql)
+        self.shapes[query_shape] += 1
+        self.params[query_shape].add(repr(params))
+        # Место запоминается на втором наборе параметров: у единичных
+        # запросов его искать незачем.
+        if (len(self.params[query_shape]) == 2
+                and query_shape not in self.locations):
+            self.locations[query_shape] = location()
+
+    @property
+    def nplusone(self):
+        """Повторяющиеся запросы: форма, число повторов и место."""
+        return [
+            {'sql': query_shape, 'count': count,
+             'location': self.locations.get(query_shape)}
+            for query_shape, count in self.shapes.items()
+            if len(self.params[query_shape]) >= settings.NPLUSONE_THRESHOLD
+        ]
+
+    def report(self):
+        return {
+            'view': self.view_name,
+            'queries': self.count,
+            'slow': self.slow,
+            'nplusone': self.nplusone,
+        }
@@ -0,0 +1,91 @@
+"""Чтение страниц лент и постов с реплик базы.
+
+View, обёрнутые ``replica_reads``, на время GET-запроса читают с одной
+из реплик ``settings.DATABASE_REPLICAS``; всё остальное — записи, формы,
+фоновые потоки — работает с основной базой ``default``.
+
+Реплика отстаёт от основной базы, поэтому после записи
+``ReplicaPinMiddleware`` ставит пользователю куку
+``settings.REPLICA_PIN_COOKIE`` на ``REPLICA_PIN_SECONDS`` секунд: пока
+она есть, его запросы читают с основной базы и он видит свои изменения.
+Кука ставится после любого запроса, кроме GET и HEAD, и после view,
+обёрнутых ``pins_primary``: подписка и отписка — GET-ссылки.
+"""
+import functools
+import random
+import threading
+
+from django.conf import settings
+
+# Сессии и кэш в базе читаются только с основной базы: сессию нужно
+# видеть сразу после входа, а кэш — сразу после записи в него.
+PRIMARY_APPS = {'sessions', 'django_cache'}
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def current_replica():
+    """Реплика, с которой читает текущий запрос, или None."""
+    return getattr(_state, 'replica', None)
+
+
+def pinned(request):
+    """Запрос должен читать с основной базы."""
+    return (request.method not in SAFE_METHODS
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES)
+
+
+def pins_primary(view):
+    """Декоратор пишущего view, который вызывается GET-запросом.
+
+    После него пользователь читает с основной базы так же, как после
+    отправки формы.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.pins_primary = True
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def writes(request):
+    """Запрос изменил данные, и автору нужно читать с основной базы."""
+    return (request.method not in SAFE_METHODS
+            or getattr(request, 'pins_primary', False))
+
+
+def replica_reads(view):
+    """Декоратор view только для чтения: база читается с реплики.
+
+    Реплика выбирается одна на весь запрос, чтобы страница собиралась
+    из одного состояния базы.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS or pinned(request):
+            return view(request, *args, **kwargs)
+        _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return 'default'
+        return current_replica() or 'default'
+
+    def db_for_write(self, model, **hints):
+        # Объект, прочитанный с реплики, сохраняется в основную базу.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными основной базы.
+        return db not in settings.DATABASE_REPLICAS
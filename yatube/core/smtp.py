@@ -0,0 +1,84 @@
+"""Локальный SMTP-сервер для тестов отправки почты.
+
+Принимает письма по минимальному подмножеству SMTP, которое нужно
+``smtplib``, и складывает их в ``messages``; ``connections`` считает
+SMTP-сессии. Адреса из ``reject`` получают на RCPT ответ 550.
+
+    with LocalSMTPServer() as server:
+        ...  # EMAIL_HOST = 'localhost', EMAIL_PORT = server.port
+"""
+import socketserver
+import threading
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost yatube SMTP')
+        sender, recipients = None, []
+        for line in self.rfile:
+            command = line.decode('latin-1').rstrip('\r\n')
+            verb = command[:4].upper()
+            argument = command.partition(':')[2].strip().strip('<>')
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, recipients = argument, []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                if argument in self.server.reject:
+                    self.reply('550 No such user')
+                    continue
+                recipients.append(argument)
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                self.server.store(sender, recipients, self.read_data())
+                self.reply('250 OK')
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def read_data(self):
+        lines = []
+        for line in self.rfile:
+            if line == b'.\r\n':
+                break
+            # Точка в начале строки удваивается отправителем.
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, reject=()):
+        super().__init__(('localhost', port), SMTPHandler)
+        self.port = self.server_address[1]
+        self.reject = set(reject)
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def store(self, sender, recipients, data):
+        with self.lock:
+            self.messages.append((sender, recipients, data))
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj, size=4):
+    """Номера страниц рядом с текущей.
+
+    В ленте из миллиона постов сотни тысяч страниц, и ссылка на
+    каждую делала страницу огромной.
+    """
+    paginator = page_obj.paginator
+    return range(max(1, page_obj.number - size),
+                 min(paginator.num_pages, page_obj.number + size) + 1)
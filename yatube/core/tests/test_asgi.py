@@ -0,0 +1,99 @@
+import asyncio
+import io
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import WSGIToASGI, build_environ
+
+
+def scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'host', b'localhost'), *headers],
+        'client': ('127.0.0.1', 5000),
+        'server': ('localhost', 8000),
+    }
+
+
+def call(application, http_scope, body=b''):
+    """Выполняет ASGI-запрос и возвращает отправленные сообщения."""
+    messages = []
+    incoming = [
+        {'type': 'http.request', 'body': body[:3], 'more_body': True},
+        {'type': 'http.request', 'body': body[3:]},
+    ]
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(http_scope, receive, send))
+    return messages
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, отдающее тело и путь по частям."""
+    start_response('201 Created', [('Content-Type', 'text/plain'),
+                                   ('X-Path', environ['PATH_INFO'])])
+    yield environ['wsgi.input'].read()
+    yield b''
+    yield environ['QUERY_STRING'].encode()
+
+
+class WSGIToASGITest(SimpleTestCase):
+    """Проверка выполнения WSGI-приложения из ASGI."""
+    def test_environ(self):
+        """Путь, строка запроса и заголовки переходят в environ."""
+        environ = build_environ(scope(
+            '/группа/', method='POST', query_string=b'page=2',
+            headers=[(b'content-type', b'text/plain'),
+                     (b'x-forwarded-for', b'10.0.0.1'),
+                     (b'x-forwarded-for', b'10.0.0.2')],
+        ), io.BytesIO())
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/группа/')
+        for key, value in {
+            'REQUEST_METHOD': 'POST',
+            'QUERY_STRING': 'page=2',
+            'CONTENT_TYPE': 'text/plain',
+            'HTTP_HOST': 'localhost',
+            'HTTP_X_FORWARDED_FOR': '10.0.0.1,10.0.0.2',
+            'REMOTE_ADDR': '127.0.0.1',
+            'SERVER_PORT': '8000',
+        }.items():
+            with self.subTest(key=key):
+                self.assertEqual(environ[key], value)
+
+    def test_response_streamed(self):
+        """Тело запроса собирается, ответ отдаётся по частям."""
+        application = WSGIToASGI(echo, 2)
+        messages = call(application,
+                        scope('/echo/', method='POST', query_string=b'q=1'),
+                        body=b'hello')
+        application.executor.shutdown()
+        start = messages[0]
+        self.assertEqual(start['status'], 201)
+        self.assertIn((b'x-path', b'/echo/'), start['headers'])
+        self.assertEqual(
+            [message['body'] for message in messages[1:]],
+            [b'hello', b'q=1', b''])
+        self.assertFalse(messages[-1].get('more_body'))
+
+    def test_django_page(self):
+        """yatube.asgi отдаёт страницы сайта."""
+        from yatube.asgi import application
+
+        messages = call(application, scope(reverse('about:tech')))
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(b'text/html', dict(
+            messages[0]['headers'])[b'content-type'])
+        self.assertIn(b'</html>', b''.join(
+            message.get('body', b'') for message in messages[1:]))
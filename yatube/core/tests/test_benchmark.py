@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.benchmark import compare, percentile
+from posts.models import Group, Post, User
+
+
+class CompareTest(TestCase):
+    """Проверка поиска регрессий между запусками."""
+    baseline = {'posts:index': {'p50_ms': 10.0, 'queries': 3}}
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 21))
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile([5], 95), 5)
+
+    def test_slower_view_is_regression(self):
+        """Рост медианы сверх порога — регрессия, в пределах — нет."""
+        self.assertEqual(compare(
+            self.baseline,
+            {'posts:index': {'p50_ms': 11.5, 'queries': 3}}, 0.2), [])
+        self.assertEqual(len(compare(
+            self.baseline,
+            {'posts:index': {'p50_ms': 13.0, 'queries': 3}}, 0.2)), 1)
+
+    def test_small_absolute_change_ignored(self):
+        """Рост меньше min_delta_ms не считается регрессией."""
+        self.assertEqual(compare(
+            {'about:tech': {'p50_ms': 1.0, 'queries': 2}},
+            {'about:tech': {'p50_ms': 1.8, 'queries': 2}}, 0.2), [])
+
+    def test_extra_query_is_regression(self):
+        """Лишний SQL-запрос — регрессия при любом времени."""
+        self.assertEqual(len(compare(
+            self.baseline,
+            {'posts:index': {'p50_ms': 9.0, 'queries': 4}}, 0.2)), 1)
+
+
+class BenchViewsCommandTest(TestCase):
+    """Проверка команды bench_views."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='bench')
+        group = Group.objects.create(title='Группа', slug='bench',
+                                     description='Описание')
+        Post.objects.create(text='Текст поста', author=user, group=group)
+        cls.directory = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def bench(self, name, **options):
+        path = os.path.join(self.directory.name, name)
+        call_command('bench_views', repeat=2, warmup=0, output=path,
+                     stdout=StringIO(), **options)
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def test_all_urls_measured(self):
+        """В отчёт попадают все страницы posts, users и about."""
+        views = self.bench('run.json')['views']
+        for name in ('posts:index', 'posts:post_edit', 'posts:search',
+                     'users:logout', 'users:password_change',
+                     'about:tech'):
+            with self.subTest(name=name):
+                self.assertIn(name, views)
+                self.assertIn(views[name]['status'], (200, 302))
+        self.assertEqual(views['posts:post_edit']['status'], 200)
+        self.assertGreater(views['posts:index']['render_ms'], 0)
+        self.assertGreater(views['posts:group_posts']['queries'], 0)
+
+    def test_requests_rolled_back(self):
+        """Запросы с записью не меняют базу."""
+        self.bench('run.json')
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(User.objects.get(username='bench').follower.exists())
+
+    def test_regression_fails_run(self):
+        """Регрессия относительно прошлого запуска завершает команду."""
+        report = self.bench('baseline.json')
+        for result in report['views'].values():
+            result['queries'] -= 1
+        path = os.path.join(self.directory.name, 'faster.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, 'Регрессии'):
+            self.bench('run.json', baseline=path)
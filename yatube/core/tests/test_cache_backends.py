@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache_backends import TwoTierCache
+
+
+def worker(sync_interval=0):
+    """Двухуровневый кэш одного воркера поверх общего locmem."""
+    return TwoTierCache('', {'OPTIONS': {
+        'SHARED': 'default',
+        'SYNC_INTERVAL': sync_interval,
+    }})
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    """Проверка двухуровневого кэша."""
+    def setUp(self):
+        cache.clear()
+
+    def test_value_is_shared_between_workers(self):
+        """Запись одного воркера видна другому."""
+        first, second = worker(), worker()
+        first.set('key', 'value')
+        self.assertEqual(second.get('key'), 'value')
+        self.assertEqual(second.get_many(['key', 'missing']),
+                         {'key': 'value'})
+
+    def test_local_tier_serves_repeat_reads(self):
+        """Повторное чтение не обращается к общему кэшу."""
+        first = worker(sync_interval=60)
+        first.set('key', 'value')
+        first.get('key')
+        cache.set('key', 'changed behind the back')
+        self.assertEqual(first.get('key'), 'value')
+
+    def test_write_invalidates_other_workers(self):
+        """Запись и удаление вытесняют ключ из LRU других воркеров."""
+        first, second = worker(), worker()
+        first.set('key', 'old')
+        self.assertEqual(second.get('key'), 'old')
+        first.set('key', 'new')
+        self.assertEqual(second.get('key'), 'new')
+        first.delete('key')
+        self.assertIsNone(second.get('key'))
+
+    def test_clear_invalidates_other_workers(self):
+        """Очистка кэша очищает LRU других воркеров."""
+        first, second = worker(), worker()
+        first.set('key', 'value')
+        second.get('key')
+        first.clear()
+        self.assertIsNone(second.get('key'))
@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    """Проверка настроек SQLite при подключении и начала транзакций."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        name = f'{self.directory}/db.sqlite3'
+        self.connections = ConnectionHandler({
+            'default': {
+                'ENGINE': 'core.db_backends.sqlite3',
+                'NAME': name,
+                'PRAGMAS': settings.SQLITE_PRAGMAS,
+            },
+            'impatient': {
+                'ENGINE': 'core.db_backends.sqlite3',
+                'NAME': name,
+                'PRAGMAS': {'busy_timeout': 0},
+            },
+        })
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (0)')
+
+    def tearDown(self):
+        self.connections.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """PRAGMA из настроек выполняются при подключении."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        for name in ('busy_timeout', 'cache_size', 'mmap_size'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.pragma(name), settings.SQLITE_PRAGMAS[name])
+
+    def test_transaction_takes_write_lock(self):
+        """Транзакция сразу берёт блокировку записи."""
+        connection = self.connections['default']
+        connection.set_autocommit(True)
+        connection._start_transaction_under_autocommit()
+        try:
+            with self.assertRaises(OperationalError):
+                with self.connections['impatient'].cursor() as cursor:
+                    cursor.execute('UPDATE counter SET value = 1')
+        finally:
+            connection.connection.rollback()
+
+    def test_concurrent_writers_wait(self):
+        """Потоки, читающие и пишущие в транзакциях, не получают
+        «database is locked»."""
+        errors = []
+
+        def work():
+            connection = self.connections['default']
+            try:
+                for _ in range(20):
+                    with connection.cursor() as cursor:
+                        connection._start_transaction_under_autocommit()
+                        cursor.execute('SELECT value FROM counter')
+                        value = cursor.fetchone()[0]
+                        cursor.execute(
+                            'UPDATE counter SET value = %s', [value + 1])
+                        connection.connection.commit()
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=work) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        with self.connections['default'].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter')
+            self.assertEqual(cursor.fetchone()[0], 80)
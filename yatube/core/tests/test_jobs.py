@@ -0,0 +1,120 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    },
+}
+
+
+@jobs.task
+def record(value):
+    calls.append(value)
+
+
+@jobs.task
+def fail(message):
+    raise ValueError(message)
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=10,
+                   JOBS_MAX_ATTEMPTS=3)
+class JobsTest(TestCase):
+    """Проверка очереди фоновых задач."""
+    def setUp(self):
+        calls.clear()
+
+    def make_due(self):
+        Job.objects.update(run_after=timezone.now())
+
+    def test_job_runs_once_and_is_deleted(self):
+        """Задача выполняется воркером и удаляется из очереди."""
+        record.delay(1)
+        self.assertEqual(calls, [])
+        self.assertEqual(jobs.run_pending(), (1, 0))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_enqueued_with_transaction(self):
+        """Задача из откаченной транзакции не попадает в очередь."""
+        try:
+            with transaction.atomic():
+                record.delay(1)
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_retried_with_backoff(self):
+        """Задача с ошибкой откладывается, задержка удваивается."""
+        fail.delay('сбой')
+        for attempt, delay in ((1, 10), (2, 20)):
+            with self.subTest(attempt=attempt):
+                started = timezone.now()
+                with self.assertLogs('core.jobs', 'WARNING'):
+                    self.assertEqual(jobs.run_pending(), (0, 1))
+                job = Job.objects.get()
+                self.assertEqual(job.attempts, attempt)
+                self.assertIn('ValueError: сбой', job.last_error)
+                self.assertGreater(job.run_after, started)
+                self.assertLessEqual(
+                    job.run_after,
+                    timezone.now() + timedelta(seconds=delay))
+                # Отложенная задача не берётся до срока.
+                self.assertEqual(jobs.run_pending(), (0, 0))
+                self.make_due()
+
+    def test_job_failed_after_max_attempts(self):
+        """После JOBS_MAX_ATTEMPTS попыток задача помечается failed."""
+        fail.delay('сбой')
+        with self.assertLogs('core.jobs', 'WARNING') as logs:
+            for _ in range(3):
+                jobs.run_pending()
+                self.make_due()
+        self.assertEqual(logs.records[-1].levelname, 'ERROR')
+        job = Job.objects.get()
+        self.assertTrue(job.failed)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(jobs.run_pending(), (0, 0))
+
+    def test_abandoned_job_redelivered(self):
+        """Задачу упавшего воркера после блокировки берёт другой."""
+        record.delay(1)
+        job = jobs.claim()
+        self.assertIsNotNone(job)
+        self.assertIsNone(jobs.claim())
+        Job.objects.update(locked_until=timezone.now())
+        job = jobs.claim()
+        self.assertEqual(job.attempts, 2)
+        jobs.run(job)
+        self.assertEqual(calls, [1])
+
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_run_jobs_command(self):
+        """run_jobs --once выполняет готовые задачи и выходит."""
+        record.delay(1)
+        record.delay(2)
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertEqual(calls, [1, 2])
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+
+    def test_run_jobs_needs_shared_cache(self):
+        """С кэшем у каждого процесса свой воркер не запускается."""
+        record.delay(1)
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(calls, [])
@@ -0,0 +1,164 @@
+from django.core import mail
+from django.core.mail import send_mail
+import threading
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.mail import FLUSH, allowance
+from core.models import Job, MailRate, OutboundMail
+from core.smtp import LocalSMTPServer
+from posts.models import User
+
+SMTP = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+@override_settings(EMAIL_BACKEND='core.mail.SpoolBackend',
+                   MAIL_DELIVERY_BACKEND=SMTP, EMAIL_HOST='localhost',
+                   MAIL_BATCH_SIZE=2, MAIL_RATE_PER_MINUTE=100,
+                   JOBS_EAGER=False)
+class MailSpoolTest(TestCase):
+    """Проверка спула исходящей почты."""
+    def send(self, count, recipient='reader@example.com'):
+        for number in range(count):
+            send_mail(f'Письмо {number}', 'Текст', 'yatube@example.com',
+                      [recipient])
+
+    def flush(self, server):
+        with self.settings(EMAIL_PORT=server.port):
+            return jobs.run_pending()
+
+    def test_send_only_spools(self):
+        """Отправка письма в запросе только пишет его в спул."""
+        with LocalSMTPServer() as server:
+            self.send(3)
+        self.assertEqual(server.connections, 0)
+        self.assertEqual(OutboundMail.objects.count(), 3)
+        # Одна задача отправки на все письма.
+        self.assertEqual(Job.objects.get().name, FLUSH)
+
+    def test_batches_over_one_connection(self):
+        """Письма уходят пачками по одному соединению и удаляются."""
+        self.send(5)
+        with LocalSMTPServer() as server:
+            self.assertEqual(self.flush(server), (1, 0))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(len(server.messages), 5)
+        sender, recipients, data = server.messages[0]
+        self.assertEqual(sender, 'yatube@example.com')
+        self.assertEqual(recipients, ['reader@example.com'])
+        self.assertIn(b'Subject: =?utf-8?', data)
+        self.assertFalse(OutboundMail.objects.exists())
+
+    @override_settings(MAIL_RATE_PER_MINUTE=3)
+    def test_rate_limit(self):
+        """Сверх лимита в минуту письма ждут следующей минуты."""
+        self.send(5)
+        with LocalSMTPServer() as server:
+            self.assertEqual(self.flush(server), (0, 0))
+        self.assertEqual(len(server.messages), 3)
+        self.assertEqual(OutboundMail.objects.count(), 2)
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 0)
+        self.assertIsNone(job.locked_until)
+        self.assertFalse(OutboundMail.objects.exclude(
+            locked_until=None).exists())
+
+    @override_settings(MAIL_RATE_PER_MINUTE=3)
+    def test_rate_limit_shared_between_workers(self):
+        """Лимит минуты общий: счётчик в базе видят все воркеры."""
+        self.assertEqual(allowance(2), 2)
+        # Следующий воркер получает только остаток лимита.
+        self.assertEqual(allowance(2), 1)
+        self.assertEqual(allowance(2), 0)
+        self.assertEqual(MailRate.objects.get().sent, 3)
+
+    def test_rejected_message_retried(self):
+        """Отклонённое письмо откладывается, остальные уходят."""
+        self.send(1, 'missing@example.com')
+        self.send(2)
+        with LocalSMTPServer(reject={'missing@example.com'}) as server:
+            self.flush(server)
+        self.assertEqual(len(server.messages), 2)
+        rejected = OutboundMail.objects.get()
+        self.assertEqual(rejected.attempts, 1)
+        self.assertIn('SMTPRecipientsRefused', rejected.last_error)
+        self.assertFalse(rejected.failed)
+        # Задача отправки повторится, когда подойдёт срок письма.
+        self.assertGreater(Job.objects.get().run_after, timezone.now())
+
+    def test_unreachable_server_retries_job(self):
+        """Без сервера письма остаются в спуле, задача повторяется."""
+        self.send(2)
+        with LocalSMTPServer() as server:
+            port = server.port
+        with self.settings(EMAIL_PORT=port):
+            with self.assertLogs('core.jobs', 'WARNING'):
+                self.assertEqual(jobs.run_pending(), (0, 1))
+        self.assertEqual(OutboundMail.objects.count(), 2)
+        self.assertEqual(Job.objects.get().attempts, 1)
+
+    @override_settings(
+        MAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_password_reset_through_spool(self):
+        """Письмо сброса пароля отправляется воркером."""
+        User.objects.create_user(username='reader',
+                                 email='reader@example.com',
+                                 password='password')
+        response = self.client.post(reverse('users:password_reset'),
+                                    {'email': 'reader@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        jobs.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].recipients(), ['reader@example.com'])
+        self.assertIn(b'/auth/reset/', mail.outbox[0].message().as_bytes())
+
+
+@override_settings(EMAIL_BACKEND='core.mail.SpoolBackend',
+                   MAIL_DELIVERY_BACKEND=SMTP, EMAIL_HOST='localhost',
+                   MAIL_BATCH_SIZE=2, MAIL_RATE_PER_MINUTE=3,
+                   JOBS_EAGER=True)
+class EagerMailSpoolTest(TransactionTestCase):
+    """Проверка спула почты при JOBS_EAGER, без воркера."""
+    def tearDown(self):
+        for timer in list(jobs.timers):
+            timer.cancel()
+        jobs.timers.clear()
+
+    def wait(self):
+        """Дожидается задач фонового потока."""
+        jobs.background.submit(lambda: None).result()
+
+    def test_flush_in_background_and_requeued(self):
+        """Отправка идёт вне потока запроса, отложенная — в очереди."""
+        threads = []
+        with LocalSMTPServer() as server:
+            server.store = lambda *message: threads.append(
+                threading.current_thread())
+            with self.settings(EMAIL_PORT=server.port):
+                # Тестовая база SQLite в памяти не ждёт блокировок, поэтому
+                # отправка начинается, когда письма уже в спуле.
+                spooled = threading.Event()
+                jobs.background.submit(spooled.wait)
+                for number in range(5):
+                    send_mail(f'Письмо {number}', 'Текст',
+                              'yatube@example.com', ['reader@example.com'])
+                spooled.set()
+                self.wait()
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.current_thread(), threads)
+        # Остаток ждёт следующей минуты в очереди и по таймеру.
+        self.assertEqual(OutboundMail.objects.count(), 2)
+        job = Job.objects.get(name=FLUSH)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(len(jobs.timers), 1)
+        Job.objects.update(run_after=timezone.now())
+        with LocalSMTPServer() as server:
+            with self.settings(EMAIL_PORT=server.port,
+                               MAIL_RATE_PER_MINUTE=100):
+                self.assertEqual(jobs.run_pending(), (1, 0))
+        self.assertEqual(len(server.messages), 2)
+        self.assertFalse(OutboundMail.objects.exists())
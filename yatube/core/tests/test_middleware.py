@@ -0,0 +1,55 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post, User
+
+
+class TimingMiddlewareTest(TestCase):
+    """Проверка замеров запросов в TimingMiddleware."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='timing')
+        cls.admin = User.objects.create_user(username='admin',
+                                             is_staff=True)
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing_header(self):
+        """Ответ содержит время, SQL-запросы, шаблон и кэш."""
+        self.client.get(reverse('posts:index'))
+        timing = self.client.get(reverse('posts:index'))['Server-Timing']
+        for part in ('total;dur=', 'db;dur=', 'queries"', 'render;dur=',
+                     'cache;desc="hit=2 miss=0"'):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logged(self):
+        """Медленный запрос пишется в журнал строкой JSON."""
+        with self.assertLogs('yatube.requests', 'WARNING') as logs:
+            self.client.get(reverse('posts:index'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'posts:index')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertEqual(line['cache_misses'], 2)
+
+    def test_metrics_for_staff_only(self):
+        """Гистограммы отдаются только сотрудникам."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.admin)
+        index = self.client.get(reverse('metrics')).json()['posts:index']
+        self.assertEqual(index['count'], 1)
+        self.assertEqual(index['buckets']['+Inf'], 1)
+        self.assertGreater(index['queries'], 0)
+        self.assertEqual(index['cache'], {'miss': 2})
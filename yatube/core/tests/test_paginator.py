@@ -0,0 +1,62 @@
+from django.core.paginator import Paginator
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.paginator import CursorPage, paginator
+from core.templatetags.pagination import page_window
+from posts.models import Post, User
+
+
+@override_settings(LIMIT_VIEWS=3)
+class CursorPaginatorTest(TestCase):
+    """Проверка навигации по курсору."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='cursor')
+        for number in range(7):
+            Post.objects.create(text=f'Пост {number}', author=user)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def get_page(self, cursor=None):
+        query = {'cursor': cursor} if cursor else {}
+        request = RequestFactory().get('/', query)
+        return paginator(Post.objects.all(), request, cursor=True)
+
+    def test_pages_walk_forward_and_back(self):
+        """Курсоры ведут по страницам вперёд и назад без пропусков."""
+        first = self.get_page()
+        self.assertIsInstance(first, CursorPage)
+        self.assertFalse(first.has_previous())
+        second = self.get_page(first.next_cursor)
+        third = self.get_page(second.next_cursor)
+        self.assertFalse(third.has_next())
+        self.assertEqual(
+            list(first) + list(second) + list(third), self.expected)
+        back = self.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(list(self.get_page(back.previous_cursor)),
+                         list(first))
+
+    def test_page_does_not_count_records(self):
+        """Курсорная страница выбирается одним запросом без COUNT."""
+        with self.assertNumQueries(1):
+            page = self.get_page()
+            list(page)
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Битый курсор возвращает первую страницу."""
+        self.assertEqual(list(self.get_page('не-курсор')),
+                         self.expected[:3])
+
+
+class PageWindowTest(TestCase):
+    """Проверка ссылок на соседние страницы."""
+    def test_window_around_current_page(self):
+        """Выводятся только страницы рядом с текущей."""
+        paginator = Paginator(range(100), 1)
+        self.assertEqual(list(page_window(paginator.page(50))),
+                         list(range(46, 55)))
+        self.assertEqual(list(page_window(paginator.page(1))),
+                         list(range(1, 6)))
+        self.assertEqual(list(page_window(paginator.page(100))),
+                         list(range(96, 101)))
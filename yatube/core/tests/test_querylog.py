@@ -0,0 +1,72 @@
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+
+from core.querylog import QueryLog, shape
+from posts.models import Post, User
+
+
+class QueryLogTest(TestCase):
+    """Проверка журнала медленных запросов и поиска N+1."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for number in range(3):
+            user = User.objects.create_user(username=f'user{number}')
+            Post.objects.create(text=f'Пост {number}', author=user)
+
+    def test_shape_ignores_values(self):
+        """Запросы, отличающиеся числами и длиной IN, одной формы."""
+        self.assertEqual(
+            shape('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            shape('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 5'))
+
+    def test_nplusone_in_template_found(self):
+        """Обращение к автору в цикле шаблона находится со строкой."""
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            for post in Post.objects.all():
+                render_to_string('includes/post_card.html', {'post': post})
+        [pattern] = log.nplusone
+        self.assertEqual(pattern['count'], 3)
+        self.assertIn('auth_user', pattern['sql'])
+        self.assertTrue(
+            pattern['location'].startswith('includes/post_card.html:'))
+
+    def test_select_related_has_no_nplusone(self):
+        """С select_related повторов нет."""
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            for post in Post.objects.select_related('author'):
+                render_to_string('includes/post_card.html', {'post': post})
+        self.assertEqual(log.nplusone, [])
+
+    def test_same_params_not_nplusone(self):
+        """Повтор запроса с теми же параметрами не считается N+1."""
+        post = Post.objects.first()
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            for _ in range(3):
+                Post.objects.get(pk=post.pk)
+        self.assertEqual(log.nplusone, [])
+
+    def test_thumbnail_lookups_per_post_found(self):
+        """Поштучное чтение ключей миниатюр sorl считается N+1."""
+        log = QueryLog()
+        for key in ('post-1', 'post-2', 'post-3'):
+            log.record('SELECT "value" FROM "thumbnail_kvstore" '
+                       'WHERE "key" = %s', 0, [key])
+        [pattern] = log.nplusone
+        self.assertEqual(pattern['count'], 3)
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged(self):
+        """Медленный запрос пишется в журнал с местом вызова."""
+        log = QueryLog('posts:index')
+        with self.assertLogs('yatube.queries', 'WARNING'):
+            with connection.execute_wrapper(log):
+                Post.objects.count()
+        [slow] = log.slow
+        self.assertEqual(slow['view'], 'posts:index')
+        self.assertEqual(slow['location'].split(':')[0],
+                         'core/tests/test_querylog.py')
@@ -0,0 +1,108 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    """Проверка чтения с реплики и чтения своих записей.
+
+    Реплика — отдельный файл SQLite, который догоняет основную базу
+    только при вызове replicate().
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            'ENGINE': 'core.db_backends.sqlite3',
+            'NAME': f'{cls.directory}/replica.sqlite3',
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Старый пост',
+                                        author=self.author)
+        self.replicate()
+
+    def replicate(self):
+        """Реплика догоняет основную базу."""
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(
+            connections['replica'].connection)
+
+    def test_pages_read_from_replica(self):
+        """Страницы лент и постов читаются с реплики."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Старый пост')
+                self.assertNotContains(response, 'Новый пост')
+        self.replicate()
+        for url in pages:
+            with self.subTest(url=url):
+                # Страница, прочитанная с отстающей реплики, не
+                # закэширована.
+                self.assertContains(self.client.get(url), 'Новый пост')
+
+    def test_no_etag_while_replica_lags(self):
+        """Страница с реплики после недавнего изменения идёт без ETag."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertNotIn('ETag', response)
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.assertIn('ETag', self.client.get(url))
+
+    def test_writer_reads_own_writes(self):
+        """После записи пользователь читает с основной базы."""
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Свой комментарий'})
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertContains(self.client.get(url), 'Свой комментарий')
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+        self.assertNotContains(self.client.get(url), 'Свой комментарий')
+
+    def test_follower_sees_own_follow(self):
+        """После подписки по ссылке профиль читается с основной базы."""
+        reader = User.objects.create_user(username='reader')
+        self.replicate()
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)),
+            follow=True)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, self.client.cookies)
+        self.assertContains(response, 'Отписаться')
+
+    def test_session_read_from_primary(self):
+        """Сессия, которой ещё нет на реплике, читается с основной базы."""
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path},
@@ -19,3 +23,10 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    """Гистограммы времени ответа по view с момента запуска процесса."""
+    return JsonResponse(request_metrics.snapshot(),
+                        json_dumps_params={'ensure_ascii': False})
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Follow, Comment, Post, Group
+from .models import Follow, Comment, Post, Group, Stats
 
 
 @admin.register(Post)
@@ -44,3 +44,14 @@ class FollowAdmin(admin.ModelAdmin):
         'author',
     )
     search_fields = ('user', 'author')
+
+
+@admin.register(Stats)
+class StatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'posts_count',
+        'followers_count',
+        'following_count',
+    )
+    search_fields = ('user__username',)
@@ -0,0 +1,106 @@
+"""Денормализованные счётчики постов, комментариев, подписок и картинок."""
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core import jobs
+from . import storage
+from .models import Comment, Follow, Post, Stats, StoredImage, User
+
+logger = logging.getLogger(__name__)
+
+
+def change(user_id, field, delta=1):
+    """Атомарно меняет счётчик пользователя на delta.
+
+    Счётчик не уходит ниже нуля, даже если успел разойтись с данными.
+    """
+    stats = Stats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    stats.update(**{field: F(field) + delta})
+
+
+def change_comments(post_id, delta=1):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def acquire_image(name):
+    """Учитывает ещё одну ссылку поста на файл картинки."""
+    if name and not StoredImage.objects.filter(name=name).update(
+            refs=F('refs') + 1):
+        StoredImage.objects.get_or_create(name=name, defaults={'refs': 1})
+
+
+def release_image(name):
+    """Снимает ссылку на файл и удаляет его, если ссылок не осталось.
+
+    Файл без записи в ``StoredImage`` не удаляется: ссылки на него
+    не посчитаны.
+    """
+    if not name or StoredImage.objects.filter(
+            name=name, refs__gt=1).update(refs=F('refs') - 1):
+        return
+    deleted, _ = StoredImage.objects.filter(name=name).delete()
+    if deleted:
+        remove_image.delay(name)
+
+
+@jobs.task
+def remove_image(name):
+    # Пока задача ждала в очереди, ту же картинку могли загрузить снова.
+    if StoredImage.objects.filter(name=name).exists():
+        return
+    try:
+        storage.remove(name, Post._meta.get_field('image').storage)
+    except SuspiciousFileOperation:
+        # Имя вне MEDIA_ROOT: повтор не поможет.
+        logger.exception('Не удалось удалить картинку %s', name)
+
+
+def count_of(queryset, field, outer='pk'):
+    """Подзапрос с числом строк queryset, где field равно OuterRef(outer)."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by().values(field).annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики по фактическим данным."""
+    Stats.objects.bulk_create(
+        (Stats(user_id=pk) for pk in
+         User.objects.filter(stats=None).values_list('pk', flat=True)),
+        batch_size=500,
+    )
+    Stats.objects.update(
+        posts_count=count_of(Post.objects, 'author', 'user'),
+        followers_count=count_of(Follow.objects, 'author', 'user'),
+        following_count=count_of(Follow.objects, 'user', 'user'),
+    )
+    Post.objects.update(comments_count=count_of(Comment.objects, 'post'))
+    recount_images()
+
+
+def recount_images():
+    """Пересчитывает ссылки на файлы картинок одним проходом по постам."""
+    refs = dict(
+        Post.objects.exclude(image='').order_by()
+        .values_list('image').annotate(Count('pk'))
+    )
+    StoredImage.objects.exclude(
+        name__in=Post.objects.values('image')).delete()
+    stored = dict(StoredImage.objects.values_list('name', 'refs'))
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, refs=count)
+        for name, count in refs.items() if name not in stored
+    )
+    for name, count in refs.items():
+        if stored.get(name, count) != count:
+            StoredImage.objects.filter(name=name).update(refs=count)
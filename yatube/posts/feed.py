@@ -0,0 +1,168 @@
+"""Лента подписок, собираемая при записи (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора. Для
+авторов, у которых подписчиков не меньше ``settings.FEED_FANOUT_LIMIT``,
+раскладка не делается: их посты подмешиваются в ленту при чтении,
+поэтому публикация поста никогда не пишет миллионы строк.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from core import cache, jobs
+from .models import FeedEntry, Follow, Post, Stats
+
+
+def is_popular(author):
+    """Проверяет, что посты автора читаются без раскладки по лентам."""
+    return Stats.objects.filter(
+        user=author, followers_count__gte=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def popular_authors(user):
+    """Возвращает id популярных авторов, на которых подписан user."""
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('author', flat=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    limit = settings.FEED_FANOUT_LIMIT
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)[:limit]
+    )
+    if len(followers) >= limit:
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author, limit=None):
+    """Добавляет в ленту user уже опубликованные посты author.
+
+    Пользователи передаются объектами или id. С limit добавляются
+    только limit последних постов; возвращается True, если у автора
+    остались более старые.
+    """
+    if is_popular(author):
+        return False
+    posts = Post.objects.filter(author=author).order_by(
+        '-pub_date').values_list('pk', 'pub_date')
+    if limit is not None:
+        posts = list(posts[:limit + 1])
+        capped, posts = len(posts) > limit, posts[:limit]
+    else:
+        capped, posts = False, posts.iterator()
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=getattr(user, 'pk', user), post_id=pk,
+                   pub_date=pub_date)
+         for pk, pub_date in posts),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return capped
+
+
+def follow(user, author):
+    """Заполняет ленту после подписки user на author.
+
+    Последние ``FEED_BACKFILL_POSTS`` постов — первые страницы ленты —
+    добавляются сразу, остальные добавляет воркер.
+    """
+    if backfill(user, author, settings.FEED_BACKFILL_POSTS):
+        backfill_follow.delay(user.pk, author.pk)
+
+
+@jobs.task
+def backfill_follow(user_id, author_id):
+    """Добавляет в ленту все посты автора, на которого подписались."""
+    # Пока задача ждала, пользователь мог отписаться.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill(user_id, author_id)
+        cache.bump(f'feed:{user_id}')
+
+
+def trim(user, author):
+    """Убирает из ленты user посты author после отписки.
+
+    Пользователи передаются объектами или id.
+    """
+    FeedEntry.objects.filter(user=user, post__author=author).delete()
+    # Автор мог перестать быть популярным: его посты больше не
+    # подмешиваются при чтении, поэтому их нужно разложить по лентам
+    # оставшихся подписчиков. Это тысячи вставок, их делает воркер.
+    if Stats.objects.filter(
+            user=author,
+            followers_count=settings.FEED_FANOUT_LIMIT - 1).exists():
+        backfill_followers.delay(getattr(author, 'pk', author))
+
+
+@jobs.task
+def backfill_followers(author_id):
+    """Раскладывает посты автора по лентам всех его подписчиков.
+
+    Пока задача ждёт в очереди, посты автора в лентах подписчиков не
+    видны. Если автор снова стал популярным, раскладка не нужна.
+    """
+    if is_popular(author_id):
+        return
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')
+    )
+    followers = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for user_id in followers for pk, pub_date in posts),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    cache.bump(*(f'feed:{user_id}' for user_id in followers))
+
+
+def rebuild():
+    """Собирает ленты всех пользователей заново по подпискам.
+
+    Нужна после массовой загрузки через ``bulk_create``, которая не
+    вызывает сигналов. Ленты заполняются одним ``INSERT ... SELECT``
+    без загрузки строк в Python; счётчики подписчиков в ``Stats``
+    должны быть уже пересчитаны.
+    """
+    FeedEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'INNER JOIN {Post._meta.db_table} post '
+            f'ON post.author_id = follow.author_id '
+            f'INNER JOIN {Stats._meta.db_table} stats '
+            f'ON stats.user_id = follow.author_id '
+            f'WHERE stats.followers_count < %s',
+            [settings.FEED_FANOUT_LIMIT],
+        )
+    return FeedEntry.objects.count()
+
+
+def get_feed(user):
+    """Возвращает посты ленты подписок user, новые сверху."""
+    posts = Post.objects.select_related('author', 'group')
+    popular = list(popular_authors(user))
+    if not popular:
+        return posts.filter(feed_entries__user=user).order_by(
+            '-feed_entries__pub_date')
+    return posts.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author_id__in=popular)
+    )
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import images
 from .models import Post, Comment
 
 
@@ -8,6 +10,21 @@ class PostForm(ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def clean_image(self):
+        """Уменьшает и перекодирует новую картинку до сохранения."""
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            if not image:
+                self.instance.image_width = None
+                self.instance.image_height = None
+                self.instance.image_size = None
+            return image
+        image = images.process(image)
+        self.instance.image_width = image.width
+        self.instance.image_height = image.height
+        self.instance.image_size = image.size
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,90 @@
+"""Обработка загружаемых картинок постов.
+
+Загрузка пишется во временный файл (``FILE_UPLOAD_HANDLERS``), размеры
+проверяются по заголовку до декодирования, затем картинка уменьшается
+до ``settings.IMAGE_MAX_SIDE``, теряет EXIF и перекодируется в
+``settings.IMAGE_FORMAT``. Камерные снимки в десятки мегапикселей не
+попадают в ``MEDIA_ROOT`` как есть и не ресайзятся при каждой миниатюре.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+# Чем сохранять результат: параметры кодировщика по формату.
+SAVE_OPTIONS = {
+    'WEBP': {'method': 4},
+    'JPEG': {'optimize': True, 'progressive': True},
+}
+
+
+def check_header(image, size):
+    """Отклоняет картинку по заголовку, не декодируя пиксели."""
+    if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ.',
+            params={'limit': settings.IMAGE_MAX_UPLOAD_SIZE // 2 ** 20},
+            code='file_too_large',
+        )
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)s×%(height)s слишком большая.',
+            params={'width': width, 'height': height},
+            code='image_too_large',
+        )
+
+
+def resize(image):
+    """Уменьшает картинку, применяет EXIF-ориентацию и приводит режим
+    к поддерживаемому форматом ``settings.IMAGE_FORMAT``."""
+    max_side = settings.IMAGE_MAX_SIDE
+    # JPEG декодируется сразу в уменьшенном масштабе.
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image.mode == 'P' and 'transparency' in image.info:
+        # Прозрачность палитры иначе потеряется при переводе в RGB.
+        image = image.convert('RGBA')
+    image_format = settings.IMAGE_FORMAT
+    if image_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if image_format == 'WEBP' and 'A' in image.getbands()
+            else 'RGB')
+    return image
+
+
+def process(upload):
+    """Возвращает уменьшенную и перекодированную картинку.
+
+    Результат — ``File`` во временном файле с атрибутами ``width``,
+    ``height`` и ``size``. Анимированные картинки не перекодируются,
+    чтобы не потерять анимацию.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    check_header(image, upload.size)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        upload.width, upload.height = image.size
+        return upload
+    try:
+        image = resize(image)
+        output = tempfile.SpooledTemporaryFile(max_size=2 ** 20)
+        # Без exif=: метаданные камеры и геометка не сохраняются.
+        image.save(output, settings.IMAGE_FORMAT,
+                   quality=settings.IMAGE_QUALITY,
+                   **SAVE_OPTIONS[settings.IMAGE_FORMAT])
+    except (OSError, Image.DecompressionBombError):
+        # Заголовок цел, а пиксели обрезаны или повреждены.
+        raise ValidationError('Файл картинки повреждён.',
+                              code='image_corrupt')
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    result = File(output, name=name + EXTENSIONS[settings.IMAGE_FORMAT])
+    result.width, result.height = image.size
+    return result
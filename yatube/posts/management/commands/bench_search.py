@@ -0,0 +1,97 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import rebuild, search_posts
+
+User = get_user_model()
+
+# Основы и окончания, из которых собираются тексты постов. Частота слов
+# убывает по закону Ципфа, как в живых текстах.
+STEMS = (
+    'дом', 'город', 'книг', 'работ', 'машин', 'дорог', 'друг', 'музык',
+    'погод', 'фотограф', 'путешеств', 'собак', 'кошк', 'мор', 'гор',
+    'сад', 'рек', 'поезд', 'самолёт', 'концерт', 'фильм', 'театр',
+    'выставк', 'библиотек', 'программ', 'компьютер', 'телефон', 'праздник',
+    'зим', 'лет', 'осен', 'весн', 'утр', 'вечер', 'ноч', 'завтрак',
+    'обед', 'ужин', 'кофе', 'чай', 'футбол', 'хоккей', 'шахмат', 'рыбалк',
+)
+ENDINGS = ('', 'а', 'у', 'ом', 'е', 'ы', 'ам', 'ами', 'ах', 'ой')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время поиска по индексу на большом числе постов. '
+            'Записи создаются внутри транзакции и откатываются по '
+            'окончании замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--words', type=int, default=12)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['posts'], options['words'],
+                          options['batch_size'])
+                self.run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, words, batch_size):
+        author = User.objects.create_user(username='bench_search')
+        vocabulary = [stem + ending for stem in STEMS for ending in ENDINGS]
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        rng = random.Random(0)
+        self.stdout.write(f'Создаём {count} постов...')
+        started = time.perf_counter()
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            Post.objects.bulk_create(
+                Post(text=' '.join(rng.choices(vocabulary, weights, k=words)),
+                     author=author)
+                for _ in range(size)
+            )
+        self.stdout.write(f'Готово за {time.perf_counter() - started:.1f} с')
+        self.stdout.write('Строим индекс...')
+        started = time.perf_counter()
+        rebuild(batch_size)
+        self.stdout.write(f'Готово за {time.perf_counter() - started:.1f} с')
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    def run(self, repeat):
+        queries = (
+            ('частое слово', 'дома'),
+            ('редкое слово', 'рыбалкой'),
+            ('два слова', 'город музыка'),
+            ('нет совпадений', 'дирижабль'),
+        )
+        self.stdout.write(
+            f'{"запрос":<16}{"найдено":>10}{"страница, мс":>16}'
+            f'{"подсчёт, мс":>14}')
+        for title, query in queries:
+            results = search_posts(query)
+            found = results.count()
+            page_ms = self.measure(
+                lambda: list(results.all()[:settings.LIMIT_VIEWS]), repeat)
+            count_ms = self.measure(lambda: results.all().count(), repeat)
+            self.stdout.write(
+                f'{title:<16}{found:>10}{page_ms:>16.2f}{count_ms:>14.2f}')
@@ -0,0 +1,41 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры для постов с картинками, у которых нет '
+            'миниатюр или записанных размеров картинки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Перестроить миниатюры всех постов.')
+        parser.add_argument('--queue', action='store_true',
+                            help='Поставить построение в очередь фоновых '
+                                 'задач, а не строить сразу.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(
+                Q(thumbnails='') | Q(image_width__isnull=True))
+        count = failed = 0
+        for pk in posts.values_list('pk', flat=True).iterator():
+            count += 1
+            if options['queue']:
+                generate.delay(pk, options['all'])
+                continue
+            try:
+                generate(pk, rebuild=options['all'])
+            except Exception:
+                logger.exception('Не удалось построить миниатюры поста %s',
+                                 pk)
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {count}, с ошибками: {failed}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Строит индекс полнотекстового поиска по текстам постов '
+            'и комментариев заново.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано постов: {count}'))
@@ -0,0 +1,246 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import feed, search
+from posts.counters import recount
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def zipf(count, alpha):
+    """Накопленные веса степенного распределения для random.choices.
+
+    Элемент с рангом r выбирается с вероятностью, пропорциональной
+    1 / r ** alpha: немногие популярные и длинный хвост остальных.
+    """
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Позволяет задать pub_date вручную, отключая auto_now_add."""
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, группами, '
+            'постами, подписками и комментариями для замеров. Записи '
+            'создаются пачками через bulk_create, после чего ленты, '
+            'счётчики и поисковый индекс собираются заново.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--follows', type=int, default=200_000)
+        parser.add_argument('--comments', type=int, default=500_000)
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона для подписчиков, постов '
+                 'авторов и комментариев к постам.')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до текущего момента распределить посты.')
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько синтетических картинок создать.')
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой, если картинки созданы.')
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='yatube')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-search-index', action='store_true',
+                            help='Не строить поисковый индекс.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.alpha = options['alpha']
+        self.now = timezone.now()
+        self.days = options['days']
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.words = sorted(set(fake.words(5000)))
+        started = time.perf_counter()
+        with transaction.atomic(), explicit_dates(Post, Comment):
+            users = self.step('Пользователи', self.create_users,
+                              options['users'], options['prefix'],
+                              options['password'])
+            groups = self.step('Группы', self.create_groups,
+                               options['groups'], options['prefix'])
+            images = self.step('Картинки', self.create_images,
+                               options['images'], options['prefix'])
+            posts = self.step('Посты', self.create_posts,
+                              options['posts'], users, groups, images,
+                              options['image_ratio'])
+            self.step('Подписки', self.create_follows,
+                      options['follows'], users)
+            self.step('Комментарии', self.create_comments,
+                      options['comments'], users, posts)
+            self.step('Счётчики', recount)
+            self.step('Ленты подписок', feed.rebuild)
+            if not options['no_search_index']:
+                self.step('Поисковый индекс', search.rebuild,
+                          self.batch_size)
+        # Версии лент в кэше не знают о новых записях.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'База наполнена за {time.perf_counter() - started:.1f} с'))
+        if images:
+            self.stdout.write('Миниатюры строит manage.py generate_thumbnails')
+
+    def step(self, title, func, *args):
+        self.stdout.write(f'{title}...', ending='')
+        self.stdout.flush()
+        started = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f' {time.perf_counter() - started:.1f} с')
+        return result
+
+    def batches(self, total):
+        for offset in range(0, total, self.batch_size):
+            yield offset, min(self.batch_size, total - offset)
+
+    def text(self, low, high):
+        return ' '.join(
+            self.rng.choices(self.words, k=self.rng.randint(low, high))
+        ).capitalize()
+
+    def create_users(self, count, prefix, password):
+        # Хэш пароля считается один раз: он медленный намеренно.
+        password = make_password(password)
+        last_pk = User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        for offset, size in self.batches(count):
+            User.objects.bulk_create(
+                User(username=f'{prefix}{offset + i}', password=password)
+                for i in range(size)
+            )
+        # Пользователи упорядочены по числу подписчиков: первый — самый
+        # читаемый автор.
+        return list(User.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def create_groups(self, count, prefix):
+        last_pk = Group.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'{prefix}-{number}',
+                  description=self.text(5, 20))
+            for number in range(count)
+        )
+        return list(Group.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True))
+
+    def create_images(self, count, prefix):
+        names = []
+        storage = Post._meta.get_field('image').storage
+        for number in range(count):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            image = Image.new('RGB', (1280, 720), color)
+            image.paste(tuple(255 - channel for channel in color),
+                        (0, 0, 640, 360))
+            content = BytesIO()
+            image.save(content, 'JPEG', quality=85)
+            names.append(storage.save(
+                f'posts/{prefix}-{number}.jpg',
+                ContentFile(content.getvalue())))
+        return names
+
+    def post_date(self, index, count):
+        """Посты равномерно распределены по времени в порядке id."""
+        return self.now - timedelta(days=self.days) * (1 - index / count)
+
+    def create_posts(self, count, users, groups, images, image_ratio):
+        # Сколько автор пишет, не связано с числом его подписчиков:
+        # иначе ленты подписчиков плодовитых авторов разрастаются до
+        # десятков миллионов строк.
+        users = users[:]
+        self.rng.shuffle(users)
+        authors = zipf(len(users), self.alpha)
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        for offset, size in self.batches(count):
+            author_ids = self.rng.choices(users, cum_weights=authors, k=size)
+            Post.objects.bulk_create(
+                Post(
+                    text=self.text(5, 40),
+                    author_id=author_id,
+                    group_id=(self.rng.choice(groups)
+                              if groups and self.rng.random() < 0.7
+                              else None),
+                    image=(self.rng.choice(images)
+                           if images and self.rng.random() < image_ratio
+                           else ''),
+                    pub_date=self.post_date(offset + i, count),
+                )
+                for i, author_id in enumerate(author_ids)
+            )
+        return list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def create_follows(self, count, users):
+        authors = zipf(len(users), self.alpha)
+        edges = set()
+        # Повторы и подписки на себя отбрасываются, поэтому пар
+        # выбирается с запасом, но не бесконечно.
+        for _ in range(10):
+            missing = count - len(edges)
+            if missing <= 0:
+                break
+            for author_id in self.rng.choices(
+                    users, cum_weights=authors, k=missing):
+                user_id = self.rng.choice(users)
+                if user_id != author_id:
+                    edges.add((user_id, author_id))
+        edges = list(edges)[:count]
+        for offset, size in self.batches(len(edges)):
+            Follow.objects.bulk_create(
+                (Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in edges[offset:offset + size]),
+                ignore_conflicts=True,
+            )
+        return len(edges)
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return 0
+        # Популярность постов не связана с их возрастом.
+        ranked = list(range(len(posts)))
+        self.rng.shuffle(ranked)
+        weights = zipf(len(ranked), self.alpha)
+        for offset, size in self.batches(count):
+            commented = self.rng.choices(ranked, cum_weights=weights, k=size)
+            Comment.objects.bulk_create(
+                Comment(
+                    post_id=posts[index],
+                    author_id=self.rng.choice(users),
+                    text=self.text(3, 20),
+                    pub_date=min(self.now, self.post_date(
+                        index, len(posts)) + timedelta(
+                            minutes=self.rng.randrange(7 * 24 * 60))),
+                )
+                for index in commented
+            )
+        return count
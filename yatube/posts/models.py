@@ -1,5 +1,10 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+
+from .storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -19,10 +24,12 @@ class Post(models.Model):
         'Текст поста',
         help_text='Введите текст поста')
     pub_date = models.DateTimeField(auto_now_add=True)
+    # Одиночные индексы внешних ключей заменены составными в Meta.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='posts'
+        related_name='posts',
+        db_index=False
     )
     group = models.ForeignKey(
         'Group',
@@ -30,21 +37,67 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         related_name='posts',
+        db_index=False,
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Размеры сохранённой картинки, см. posts.images.
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_size = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # JSON с адресами миниатюр картинки, см. posts.thumbnails.
+    thumbnails = models.TextField(blank=True, editable=False)
+    # Растёт при каждом изменении, входит в ключ кэша карточки поста.
+    version = models.PositiveIntegerField(default=1, editable=False)
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('pub_date', 'id'),
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=('author', '-pub_date'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnail_variants(self):
+        """Заранее построенные миниатюры по именам вариантов размеров:
+        адрес, ширина и высота."""
+        try:
+            variants = json.loads(self.thumbnails)
+        except ValueError:
+            return {}
+        if not isinstance(variants, dict):
+            return {}
+        # Миниатюры, построенные до вариантов для srcset, хранят адрес.
+        return {
+            name: tuple(value) if isinstance(value, list)
+            else (value, None, None)
+            for name, value in variants.items()
+        }
+
+    @cached_property
+    def thumbnail_urls(self):
+        """Адреса заранее построенных миниатюр по именам размеров."""
+        return {
+            name: url for name, (url, _, _) in self.thumbnail_variants.items()
+        }
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -54,6 +107,7 @@ class Comment(models.Model):
         'Post',
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -70,16 +124,115 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('post', '-pub_date'),
+                         name='comment_post_pub_date_idx'),
+        )
 
 
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='follower'
+        related_name='follower',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='follow_user_author_unique'),
+        )
+
+
+class FeedEntry(models.Model):
+    """Запись в заранее собранной ленте подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), поэтому
+    ``follow_index`` читает ленту по индексу ``(user, pub_date)`` без
+    соединения ``Post``, ``User`` и ``Follow``.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(fields=('user', 'pub_date'),
+                         name='feedentry_user_pub_date_idx'),
+        )
+
+
+class Stats(models.Model):
+    """Счётчики пользователя, которые иначе считались бы агрегатами.
+
+    Обновляются сигналами вместе с постами, комментариями и подписками;
+    расхождения исправляет команда ``manage.py recount_stats``.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс полнотекстового поиска.
+
+    Основа слова, пост, в тексте или комментариях которого она
+    встречается, и вес: сколько раз, с приоритетом текста поста.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        'Post',
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'post')
+        indexes = (
+            # Покрывает поиск: лучшие посты по слову читаются по порядку.
+            models.Index(fields=('term', '-weight', '-post'),
+                         name='searchterm_term_weight_idx'),
+        )
+
+    def __str__(self):
+        return self.term
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище, общий для постов с одинаковыми
+    картинками.
+
+    ``refs`` — сколько постов на него ссылается, ``thumbnails`` — JSON
+    с адресами миниатюр, общих для этих постов.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    refs = models.PositiveIntegerField(default=0)
+    thumbnails = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,250 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты разбиваются на слова, слова приводятся к основе стеммером
+Snowball для русского языка и складываются в инвертированный индекс
+``SearchTerm`` (основа -> пост, вес). Индекс поста пересобирается
+сигналами при сохранении поста и его комментариев, поэтому поиск —
+это выборка по индексу ``(term, post)`` без сканирования текстов.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.db.models import Count, F, Sum
+
+from .models import Comment, Post, SearchTerm
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+# Слово в тексте поста весит больше, чем в комментарии к нему.
+POST_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'в', 'вам',
+    'вас', 'во', 'вот', 'все', 'всё', 'вы', 'да', 'для', 'до', 'его',
+    'ее', 'её', 'ей', 'ему', 'если', 'есть', 'еще', 'ещё', 'же', 'за',
+    'и', 'из', 'или', 'им', 'их', 'к', 'как', 'ко', 'когда', 'кто', 'ли',
+    'мне', 'мы', 'на', 'над', 'не', 'нет', 'ни', 'но', 'о', 'об', 'он',
+    'она', 'они', 'оно', 'от', 'по', 'под', 'при', 'с', 'со', 'так',
+    'также', 'то', 'только', 'ты', 'у', 'уже', 'что', 'это', 'я',
+))
+
+VOWELS = 'аеиоуыэюя'
+
+
+def endings(group, *words):
+    """Окончания группы, самые длинные первыми."""
+    return sorted(((word, group) for word in words),
+                  key=lambda item: -len(item[0]))
+
+
+# Окончания группы 1 должны следовать за «а» или «я».
+PERFECTIVE_GERUND = endings(1, 'в', 'вши', 'вшись') + endings(
+    2, 'ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')
+ADJECTIVE = endings(
+    2, 'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую',
+    'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE = endings(1, 'ем', 'нн', 'вш', 'ющ', 'щ') + endings(
+    2, 'ивш', 'ывш', 'ующ')
+REFLEXIVE = endings(2, 'ся', 'сь')
+VERB = endings(
+    1, 'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+    'ет', 'ют', 'ны', 'ть', 'ешь', 'нно') + endings(
+    2, 'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+    'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует',
+    'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю')
+NOUN = endings(
+    2, 'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я')
+SUPERLATIVE = endings(2, 'ейше', 'ейш')
+
+
+def strip_ending(rv, group_endings):
+    """Отрезает самое длинное подходящее окончание.
+
+    Как в Snowball, если самое длинное окончание группы 1 не стоит
+    после «а» или «я», шаг считается неудачным.
+    """
+    for ending, group in sorted(group_endings,
+                                key=lambda item: -len(item[0])):
+        if rv.endswith(ending):
+            stem = rv[:-len(ending)]
+            if group == 1 and not stem.endswith(('а', 'я')):
+                return rv, False
+            return stem, True
+    return rv, False
+
+
+def region_after(word, start):
+    """Начало области после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    """Возвращает основу слова по алгоритму Snowball для русского."""
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (i for i, char in enumerate(word) if char in VOWELS), None)
+    if first_vowel is None:
+        return word
+    rv_start = first_vowel + 1
+    r2 = region_after(word, region_after(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv, found = strip_ending(rv, PERFECTIVE_GERUND)
+    if not found:
+        rv, _ = strip_ending(rv, REFLEXIVE)
+        rv, found = strip_ending(rv, ADJECTIVE)
+        if found:
+            rv, _ = strip_ending(rv, PARTICIPLE)
+        else:
+            rv, found = strip_ending(rv, VERB)
+            if not found:
+                rv, _ = strip_ending(rv, NOUN)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    for ending in ('ость', 'ост'):
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+
+    rv, found = strip_ending(rv, SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not found and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def terms(text):
+    """Разбивает текст на основы слов без стоп-слов."""
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS
+    ]
+
+
+def term_weights(post, comments=()):
+    weights = Counter()
+    for term in terms(post.text):
+        weights[term] += POST_WEIGHT
+    for text in comments:
+        for term in terms(text):
+            weights[term] += COMMENT_WEIGHT
+    return weights
+
+
+def index_post(post):
+    """Пересобирает индекс поста по его тексту и комментариям."""
+    comments = post.comments.values_list('text', flat=True)
+    SearchTerm.objects.filter(post=post).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post=post, weight=weight)
+        for term, weight in term_weights(post, comments).items()
+    )
+
+
+def rebuild(batch_size=1000):
+    """Строит индекс всех постов заново, возвращает число постов.
+
+    Посты и их комментарии читаются пачками, чтобы не держать в памяти
+    всю базу.
+    """
+    SearchTerm.objects.all().delete()
+    count = 0
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .only('pk', 'text')[:batch_size])
+        if not posts:
+            return count
+        comments = {}
+        for post_id, text in Comment.objects.filter(
+                post__in=posts).values_list('post_id', 'text'):
+            comments.setdefault(post_id, []).append(text)
+        SearchTerm.objects.bulk_create(
+            (SearchTerm(term=term, post_id=post.pk, weight=weight)
+             for post in posts
+             for term, weight in term_weights(
+                 post, comments.get(post.pk, ())).items())
+        )
+        count += len(posts)
+        last_pk = posts[-1].pk
+
+
+def add_text(post_id, text, weight=COMMENT_WEIGHT):
+    """Добавляет в индекс поста слова нового текста (комментария)."""
+    counts = Counter(terms(text))
+    if not counts:
+        return
+    existing = set(SearchTerm.objects.filter(
+        post_id=post_id, term__in=counts).values_list('term', flat=True))
+    for term in existing:
+        SearchTerm.objects.filter(post_id=post_id, term=term).update(
+            weight=F('weight') + counts[term] * weight)
+    SearchTerm.objects.bulk_create(
+        (SearchTerm(term=term, post_id=post_id, weight=count * weight)
+         for term, count in counts.items() if term not in existing),
+        ignore_conflicts=True,
+    )
+
+
+def remove_text(post_id, text, weight=COMMENT_WEIGHT):
+    """Убирает из индекса поста слова удалённого текста."""
+    counts = Counter(terms(text))
+    for term, count in counts.items():
+        SearchTerm.objects.filter(post_id=post_id, term=term).update(
+            weight=F('weight') - count * weight)
+    SearchTerm.objects.filter(
+        post_id=post_id, term__in=counts, weight__lte=0).delete()
+
+
+def search_posts(query):
+    """Возвращает найденные посты как пары ``post_id``, ``rank``.
+
+    Находятся посты со всеми словами запроса, лучшие сверху; ранг —
+    сумма весов найденных основ. Запрос из одного слова читается
+    прямо из индекса ``(term, weight, post)`` без группировки, поэтому
+    первая страница не зависит от числа совпадений. Сами посты для
+    страницы загружает ``load_posts``.
+    """
+    query_terms = set(terms(query))
+    if not query_terms:
+        return SearchTerm.objects.none().values('post_id')
+    if len(query_terms) == 1:
+        ranked = SearchTerm.objects.filter(term=query_terms.pop()).annotate(
+            rank=F('weight'))
+    else:
+        ranked = (
+            SearchTerm.objects
+            .filter(term__in=query_terms)
+            .values('post_id')
+            .annotate(rank=Sum('weight'), matched=Count('pk'))
+            .filter(matched=len(query_terms))
+        )
+    return ranked.values('post_id', 'rank').order_by('-rank', '-post_id')
+
+
+def load_posts(page_obj):
+    """Заменяет строки индекса на странице постами в том же порядке."""
+    rows = list(page_obj.object_list)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row['post_id'] for row in rows])
+    page_obj.object_list = []
+    for row in rows:
+        post = posts.get(row['post_id'])
+        if post is not None:
+            post.rank = row['rank']
+            page_obj.object_list.append(post)
+    return page_obj
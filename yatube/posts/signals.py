@@ -0,0 +1,236 @@
+from django.conf import settings
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import cache
+from . import counters, feed, search
+from .models import Comment, Follow, Group, Post, Stats, User
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        Stats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'posts_count')
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_saved(sender, instance, update_fields, **kwargs):
+    """Запоминает сохранённые картинку и группу поста до правки."""
+    if instance._state.adding:
+        instance._saved_image = ''
+        instance._saved_group_id = None
+    elif update_fields is None or {'image', 'group'} & set(update_fields):
+        instance._saved_image, instance._saved_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('image', 'group_id').first() or ('', None))
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    saved = getattr(instance, '_saved_image', None)
+    if saved is not None and saved != (instance.image.name or ''):
+        counters.acquire_image(instance.image.name)
+        counters.release_image(saved)
+    instance._saved_image = None
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    counters.release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.user_id, 'following_count')
+        counters.change(instance.author_id, 'followers_count')
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change(instance.user_id, 'following_count', -1)
+    counters.change(instance.author_id, 'followers_count', -1)
+
+
+def follower_feeds(author_id):
+    """Возвращает ленты подписчиков автора, которые нужно сбросить.
+
+    Ленты подписчиков популярного автора не сбрасываются поштучно,
+    они устаревают не дольше чем на ``settings.FEED_CACHE_SECONDS``.
+    """
+    limit = settings.FEED_FANOUT_LIMIT
+    followers = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)[:limit]
+    )
+    if len(followers) >= limit:
+        return []
+    return [f'feed:{user_id}' for user_id in followers]
+
+
+def index_pages(**lookup):
+    """Возвращает кэшируемые страницы главной с подходящими постами.
+
+    ``lookup`` задаёт одно поле и значение, например ``group_id=1``.
+    """
+    (field, value), = lookup.items()
+    per_page = settings.LIMIT_VIEWS
+    window = Post.objects.values_list(field, flat=True)[
+        :settings.INDEX_CACHE_PAGES * per_page]
+    return {
+        position // per_page + 1
+        for position, current in enumerate(window)
+        if current == value
+    }
+
+
+def invalidate_index(**lookup):
+    cache.delete_pages('index', 'index', index_pages(**lookup))
+
+
+@receiver(pre_save, sender=Post)
+def bump_post_version(sender, instance, update_fields, **kwargs):
+    if not instance._state.adding and (
+            update_fields is None or 'version' in update_fields):
+        instance.version += 1
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    cache.bump(f'profile:{instance.author_id}',
+               *follower_feeds(instance.author_id))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_index_on_post_save(sender, instance, created, **kwargs):
+    # Новый пост сдвигает все страницы, правка меняет только одну.
+    if created:
+        cache.bump('index')
+    else:
+        invalidate_index(pk=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Group)
+def invalidate_index_on_delete(sender, instance, **kwargs):
+    cache.bump('index')
+
+
+@receiver(post_save, sender=Group)
+def invalidate_index_on_group_save(sender, instance, created, **kwargs):
+    if not created:
+        # Ссылка на группу есть в карточках всех её постов.
+        Post.objects.filter(group=instance).update(version=F('version') + 1)
+        invalidate_index(group_id=instance.pk)
+        # Закэшированные страницы профилей и лент хранят посты со старой
+        # версией, поэтому сбрасываются у всех авторов группы.
+        authors = Post.objects.filter(group=instance).values_list(
+            'author_id', flat=True).distinct()
+        for author_id in authors:
+            cache.bump(f'profile:{author_id}', *follower_feeds(author_id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile(sender, instance, created, update_fields, **kwargs):
+    cache.bump(f'profile:{instance.pk}')
+    # При входе сохраняется только last_login, имя автора не меняется.
+    if not created and update_fields != frozenset(('last_login',)):
+        # Имя автора есть в карточках всех его постов.
+        Post.objects.filter(author=instance).update(version=F('version') + 1)
+        cache.bump(*follower_feeds(instance.pk))
+        invalidate_index(author_id=instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.follow(instance.user, instance.author)
+        cache.bump(f'feed:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed(sender, instance, **kwargs):
+    feed.trim(instance.user_id, instance.author_id)
+    cache.bump(f'feed:{instance.user_id}')
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment_text(sender, instance, created, **kwargs):
+    if created:
+        search.add_text(instance.post_id, instance.text)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment_text(sender, instance, **kwargs):
+    search.remove_text(instance.post_id, instance.text)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post(sender, instance, **kwargs):
+    groups = {instance.group_id, getattr(instance, '_saved_group_id', None)}
+    instance._saved_group_id = None
+    cache.touch(f'post:{instance.pk}', *(
+        f'group:{group_id}' for group_id in groups if group_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_post(sender, instance, **kwargs):
+    cache.touch(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+def touch_group(sender, instance, **kwargs):
+    cache.touch(f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_profiles(sender, instance, **kwargs):
+    # Счётчики подписок и кнопка подписки на страницах профилей.
+    cache.touch(f'profile:{instance.user_id}',
+                f'profile:{instance.author_id}')
+
+
+@receiver(post_save, sender=User)
+def touch_users(sender, instance, created, update_fields, **kwargs):
+    # Имена пользователей есть на любой странице с постами.
+    if not created and update_fields != frozenset(('last_login',)):
+        cache.touch('users')
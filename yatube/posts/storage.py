@@ -0,0 +1,45 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 своего содержимого, поэтому
+одинаковые картинки разных постов — один файл и один набор миниатюр
+sorl-thumbnail. Сколько постов ссылается на файл, считает
+``StoredImage.refs`` (см. posts.counters); файл и его миниатюры
+удаляются, когда ссылок не остаётся.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Кладёт файл в ``<каталог>/<ab>/<sha256>.<расширение>``.
+
+    Хэш считается по частям файла, без чтения его в память целиком.
+    Если файл с таким хэшем уже есть, повторно он не записывается.
+    """
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            return super().save(name, content, max_length)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+def remove(name, storage):
+    """Удаляет файл вместе с его миниатюрами."""
+    image = ImageFile(name, storage)
+    default.kvstore.delete(image)
+    storage.delete(name)
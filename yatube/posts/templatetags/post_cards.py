@@ -0,0 +1,50 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import count
+from ..thumbnails import prefetch
+
+register = template.Library()
+
+
+def card_key(post, show_group):
+    return f'card:{post.pk}:{post.version}:{int(show_group)}'
+
+
+@register.simple_tag
+def post_cards(posts, show_group=True):
+    """Возвращает разметку карточек постов страницы по id поста.
+
+    Карточки страницы читаются из кэша одним get_many, недостающие
+    рендерятся и сохраняются одним set_many. Миниатюры недостающих
+    карточек читаются из хранилища sorl тоже разом. Ключ включает версию
+    поста, поэтому правка поста или переименование автора сразу дают
+    новую карточку.
+    """
+    keys = {card_key(post, show_group): post for post in posts}
+    cards = cache.get_many(keys)
+    prefetch([post for key, post in keys.items() if key not in cards],
+             'card')
+    missing = {
+        key: render_to_string('includes/post_card.html', {
+            'post': post,
+            'show_group': show_group,
+        })
+        for key, post in keys.items()
+        if key not in cards
+    }
+    count('card', 'hit', len(cards))
+    count('card', 'miss', len(missing))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_SECONDS)
+        cards.update(missing)
+    return {post.pk: mark_safe(cards[key]) for key, post in keys.items()}
+
+
+@register.filter
+def card(cards, post):
+    """Достаёт карточку поста из результата post_cards."""
+    return cards.get(post.pk, '')
@@ -0,0 +1,52 @@
+from django import template
+from django.utils.html import format_html
+
+from ..thumbnails import LAYOUTS, WIDTHS, fallback_url, variant
+
+register = template.Library()
+
+# Ширина картинки в вёрстке на разных экранах для атрибута sizes:
+# карточка занимает контейнер Bootstrap, картинка поста — col-md-9.
+SIZES_ATTRIBUTES = {
+    'card': ('(min-width: 1200px) 1110px, (min-width: 992px) 930px, '
+             '(min-width: 768px) 690px, (min-width: 576px) 510px, 100vw'),
+    'detail': ('(min-width: 1200px) 803px, (min-width: 992px) 668px, '
+               '(min-width: 768px) 488px, 100vw'),
+}
+
+
+def srcset(post, name):
+    """Строка srcset из построенных вариантов размера name."""
+    candidates = {}
+    for width in WIDTHS:
+        url, actual_width, _ = post.thumbnail_variants.get(
+            variant(name, width), (None, None, None))
+        if url and actual_width:
+            candidates.setdefault(url, actual_width)
+    return ', '.join(
+        f'{url} {width}w' for url, width in sorted(
+            candidates.items(), key=lambda candidate: candidate[1]))
+
+
+@register.simple_tag
+def responsive_image(post, name, css_class='', lazy=True):
+    """Тег img с src, srcset и sizes из заранее построенных миниатюр.
+
+    Пока миниатюры поста не построены, показывается одна миниатюра
+    sorl-thumbnail, прочитанная ``thumbnails.prefetch`` или построенная
+    на месте.
+    """
+    if not post.image or name not in LAYOUTS:
+        return ''
+    loading = format_html(' loading="lazy"') if lazy else ''
+    url, width, _ = post.thumbnail_variants.get(name, (None, None, None))
+    if url and width:
+        return format_html(
+            '<img class="{}" src="{}" srcset="{}" sizes="{}"{}>',
+            css_class, url, srcset(post, name), SIZES_ATTRIBUTES[name],
+            loading,
+        )
+    url = url or fallback_url(post, name)
+    if not url:
+        return ''
+    return format_html('<img class="{}" src="{}"{}>', css_class, url, loading)
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import page_key, stats
+from ..models import Follow, Group, Post, User
+from ..templatetags.post_cards import card_key
+
+
+class FeedCacheTest(TestCase):
+    """Проверка кэша ленты подписок и страниц профиля."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(text='Первый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_repeat_feed_read_hits_cache(self):
+        """Повторное чтение ленты берётся из кэша."""
+        hits = stats['feed', 'hit']
+        misses = stats['feed', 'miss']
+        first = self.client.get(reverse('posts:follow_index'))
+        second = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(stats['feed', 'miss'], misses + 1)
+        self.assertEqual(stats['feed', 'hit'], hits + 1)
+        self.assertEqual(list(first.context['page_obj']),
+                         list(second.context['page_obj']))
+
+    def test_new_post_invalidates_feed_and_profile(self):
+        """Новый пост автора сразу виден в ленте и профиле."""
+        urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args={self.author.username}),
+        )
+        for url in urls:
+            self.client.get(url)
+        post = Post.objects.create(text='Второй пост', author=self.author)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn(post, response.context['page_obj'])
+
+    def test_unfollow_invalidates_feed(self):
+        """После отписки лента подписок пустеет."""
+        self.client.get(reverse('posts:follow_index'))
+        self.client.get(reverse('posts:profile_unfollow',
+                                args={self.author.username}))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_group_rename_invalidates_feed_and_profile(self):
+        """Новый адрес группы сразу виден в ленте и профиле автора."""
+        group = Group.objects.create(title='Старое название', slug='old',
+                                     description='Группа')
+        Post.objects.create(text='Пост в группе', author=self.author,
+                            group=group)
+        urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args={self.author.username}),
+        )
+        for url in urls:
+            self.client.get(url)
+        group.title = 'Новое название'
+        group.slug = 'new'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '/group/new/')
+                self.assertNotContains(response, '/group/old/')
+
+
+@override_settings(LIMIT_VIEWS=1)
+class PageNumberCacheTest(TestCase):
+    """Проверка ключей кэша страниц с неверным номером."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=author)
+        cls.newest = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_zero_does_not_replace_first_page(self):
+        """?page=0 отдаёт последнюю страницу, но не кэширует её как первую."""
+        self.client.get(reverse('posts:index') + '?page=0')
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.newest])
+
+    def test_out_of_range_page_not_cached(self):
+        """Страница вне диапазона не попадает в кэш под своим номером."""
+        self.client.get(reverse('posts:index') + '?page=5')
+        self.assertIsNone(cache.get(page_key('index', 'index', 'p5')))
+        self.assertIsNone(cache.get(page_key('index', 'index', 'p3')))
+
+
+class PostCardCacheTest(TestCase):
+    """Проверка кэша разметки карточек постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Текст карточки',
+                                       author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_are_cached_by_version(self):
+        """Карточка кэшируется и заменяется новой после правки поста."""
+        self.client.get(reverse('posts:index'))
+        self.assertIn(card_key(self.post, True),
+                      cache.get_many([card_key(self.post, True)]))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст карточки'
+        post.save()
+        self.assertEqual(post.version, self.post.version + 1)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст карточки')
+
+    def test_author_rename_refreshes_cards(self):
+        """Переименование автора видно в карточках его постов."""
+        self.client.get(reverse('posts:index'))
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Лев Толстой')
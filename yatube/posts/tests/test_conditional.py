@@ -0,0 +1,142 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    """Проверка ответов 304 по ETag."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, client=None):
+        """Запрашивает страницу и повторяет запрос с её ETag."""
+        client = client or self.client
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag'], client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def assertUnchanged(self, url, client=None):
+        _, response = self.revalidate(url, client)
+        self.assertEqual(response.status_code, 304)
+
+    def assertChanged(self, url, change):
+        etag, _ = self.revalidate(url)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_pages_not_modified(self):
+        """Неизменившиеся страницы отдаются ответом 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertUnchanged(url)
+
+    def test_not_modified_without_page_queries(self):
+        """Ответ 304 главной страницы не обращается к базе."""
+        etag, _ = self.revalidate(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('posts:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_last_modified(self):
+        """If-Modified-Since без ETag не даёт 304 чужой версии страницы."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.client.force_login(self.author)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_post_changes_feeds(self):
+        """Новый пост меняет главную, группу и профиль автора."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertChanged(url, lambda: Post.objects.create(
+                    text='Новый', author=self.author, group=self.group))
+
+    def test_moved_post_changes_old_group(self):
+        """Перенос поста в другую группу меняет страницу старой группы."""
+        post = Post.objects.create(
+            text='Переносимый', author=self.author, group=self.group)
+
+        def move():
+            post.group = self.other_group
+            post.save()
+
+        self.assertChanged(
+            reverse('posts:group_posts', args=(self.group.slug,)), move)
+
+    def test_comment_changes_post(self):
+        """Новый комментарий меняет страницу поста."""
+        self.assertChanged(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'))
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет страницу профиля автора."""
+        self.assertChanged(
+            reverse('posts:profile', args=(self.author.username,)),
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author))
+
+    def test_rename_changes_pages(self):
+        """Смена имени автора меняет страницы с его постами."""
+        def rename():
+            author = User.objects.get(pk=self.author.pk)
+            author.first_name = 'Автор'
+            author.save()
+
+        self.assertChanged(
+            reverse('posts:post_detail', args=(self.post.pk,)), rename)
+
+    def test_etag_depends_on_user(self):
+        """У гостя и пользователя разные ETag одной страницы."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        guest_etag = self.client.get(url)['ETag']
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(url, HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertUnchanged(url, client)
+
+    def test_missing_page(self):
+        """Несуществующие страницы отвечают 404, а не 304."""
+        urls = (
+            reverse('posts:group_posts', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(0,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code,
+                    404)
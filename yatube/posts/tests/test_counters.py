@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, Stats, User
+
+
+class CountersTest(TestCase):
+    """Проверка денормализованных счётчиков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return Stats.objects.get(user=user)
+
+    def test_views_update_counters(self):
+        """Пост, комментарий и подписка меняют счётчики."""
+        self.client.post(reverse('posts:add_comment', args={self.post.id}),
+                         data={'text': 'Коммент'})
+        self.client.post(reverse('posts:post_create'), data={'text': 'Мой'})
+        self.client.get(reverse('posts:profile_follow',
+                                args={self.author.username}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.client.get(reverse('posts:profile_unfollow',
+                                args={self.author.username}))
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счётчики."""
+        Stats.objects.filter(user=self.author).update(posts_count=42)
+        Stats.objects.filter(user=self.reader).delete()
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from ..feed import get_feed
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedTest(TestCase):
+    """Проверка ленты подписок, собираемой при записи."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def test_follow_backfills_and_unfollow_trims_feed(self):
+        """Подписка добавляет старые посты автора, отписка убирает."""
+        self.client.force_login(self.reader)
+        self.client.get(reverse('posts:profile_follow',
+                                args={self.author.username}))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.client.get(reverse('posts:profile_unfollow',
+                                args={self.author.username}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(list(get_feed(self.reader)), [post, self.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(
+            user=User.objects.create_user(username='fan'), author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(get_feed(self.reader)), [post, self.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2, JOBS_EAGER=False)
+    def test_unfollow_of_popular_author_backfills_in_job(self):
+        """Посты переставшего быть популярным автора раскладывает воркер."""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Follow.objects.filter(user=fan).delete()
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(jobs.run_pending(), (1, 0))
+        self.assertEqual(list(get_feed(self.reader)), [post, self.old_post])
+
+    @override_settings(FEED_BACKFILL_POSTS=1, JOBS_EAGER=False)
+    def test_follow_backfills_older_posts_in_job(self):
+        """При подписке сразу добавляются последние посты, старые — воркер."""
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(get_feed(self.reader)), [post])
+        self.assertEqual(jobs.run_pending(), (1, 0))
+        self.assertEqual(list(get_feed(self.reader)), [post, self.old_post])
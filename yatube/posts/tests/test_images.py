@@ -0,0 +1,139 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..images import process
+from ..models import Post, User
+from ..thumbnails import generate
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Тег EXIF с ориентацией: 6 — повернуть на 90° по часовой стрелке.
+ORIENTATION = 0x0112
+
+
+def jpeg(width, height, orientation=None, name='photo.jpg'):
+    """Загрузка JPEG заданного размера, при желании с EXIF."""
+    image = Image.new('RGB', (width, height), 'red')
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=200,
+                   IMAGE_FORMAT='WEBP')
+class ImagePipelineTest(TestCase):
+    """Проверка обработки загружаемых картинок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_large_image_is_downscaled_and_converted(self):
+        """Большая картинка уменьшается и перекодируется в WEBP."""
+        result = process(jpeg(800, 400))
+        self.assertEqual((result.width, result.height), (200, 100))
+        self.assertTrue(result.name.endswith('.webp'))
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (200, 100))
+
+    def test_exif_is_applied_and_stripped(self):
+        """Ориентация из EXIF применяется, сами метаданные удаляются."""
+        result = process(jpeg(400, 200, orientation=6))
+        self.assertEqual((result.width, result.height), (100, 200))
+        with Image.open(result) as image:
+            self.assertNotIn(ORIENTATION, image.getexif())
+
+    @override_settings(IMAGE_FORMAT='JPEG')
+    def test_jpeg_output(self):
+        """Формат результата берётся из настроек."""
+        result = process(jpeg(100, 100, name='photo.png'))
+        self.assertTrue(result.name.endswith('.jpg'))
+        with Image.open(result) as image:
+            self.assertEqual(image.format, 'JPEG')
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с большим числом пикселей отклоняется по заголовку."""
+        with self.assertRaises(ValidationError):
+            process(jpeg(20, 20))
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_too_large_file_rejected(self):
+        """Слишком большой файл отклоняется."""
+        with self.assertRaises(ValidationError):
+            process(jpeg(20, 20))
+
+    def test_post_create_stores_processed_image(self):
+        """Форма сохраняет обработанную картинку и её размеры."""
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с фотографией',
+            'image': jpeg(800, 400),
+        })
+        post = Post.objects.get(text='Пост с фотографией')
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual((post.image_width, post.image_height), (200, 100))
+        self.assertEqual(post.image_size, post.image.size)
+
+    def test_palette_transparency_kept(self):
+        """Прозрачность палитровой картинки сохраняется в WEBP."""
+        image = Image.new('P', (20, 20), 0)
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG', transparency=0)
+        result = process(SimpleUploadedFile(
+            'icon.png', buffer.getvalue(), 'image/png'))
+        with Image.open(result) as image:
+            self.assertEqual(image.mode, 'RGBA')
+            self.assertEqual(image.getpixel((0, 0))[3], 0)
+
+    def test_truncated_image_rejected(self):
+        """Обрезанный JPEG показывается как ошибка формы, а не 500."""
+        data = jpeg(800, 400).read()
+        response = self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с битой фотографией',
+            'image': SimpleUploadedFile(
+                'broken.jpg', data[:len(data) // 2], 'image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(
+            Post.objects.filter(text='Пост с битой фотографией').exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_post_create_shows_error(self):
+        """Отклонённая картинка показывается как ошибка формы."""
+        response = self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с огромной фотографией',
+            'image': jpeg(20, 20),
+        })
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(
+            Post.objects.filter(text='Пост с огромной фотографией').exists())
+
+    def test_generate_fills_missing_dimensions(self):
+        """Миниатюры записывают размеры картинок старых постов."""
+        post = Post.objects.create(
+            text='Старый пост', author=self.user, image=jpeg(30, 20))
+        generate(post.pk)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+        self.assertEqual(post.image_size, post.image.size)
@@ -0,0 +1,97 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class IndexUsageTest(TestCase):
+    """Запросы страниц используют составные индексы (EXPLAIN)."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='TestGroup', slug='test_slug')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(text='Коммент', post=cls.post,
+                               author=cls.reader)
+        cls.expected_indexes = {
+            # Уникальное ограничение SQLite создаёт как автоиндекс
+            # таблицы, поэтому проверяем условие поиска по нему.
+            reverse('posts:profile', args={cls.author.username}): (
+                'post_author_pub_date_idx',
+                'posts_follow USING COVERING INDEX',
+                '(user_id=? AND author_id=?)'),
+            reverse('posts:group_posts', args={cls.group.slug}): (
+                'post_group_pub_date_idx',),
+            reverse('posts:post_detail', args={cls.post.id}): (
+                'comment_post_pub_date_idx',),
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def query_plans(self, url):
+        """Возвращает планы всех SELECT-запросов, выполненных страницей."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append(' '.join(
+                        str(row[-1]) for row in cursor.fetchall()))
+        return '\n'.join(plans)
+
+    def test_views_use_composite_indexes(self):
+        """В планах запросов страниц есть нужные индексы."""
+        for url, indexes in self.expected_indexes.items():
+            plans = self.query_plans(url)
+            for index in indexes:
+                with self.subTest(url=url, index=index):
+                    self.assertIn(index, plans)
+
+
+class DuplicateFollowMigrationTest(TransactionTestCase):
+    """Миграция 0015 убирает дубли подписок и поправляет счётчики."""
+    before = [('posts', '0014_stats')]
+    after = [('posts', '0015_hot_query_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # Остальные тесты ждут схему последней миграции.
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_stats_recounted(self):
+        """Счётчики подписок после миграции считаются без дублей."""
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Follow = apps.get_model('posts', 'Follow')
+        Stats = apps.get_model('posts', 'Stats')
+        author = User.objects.create(username='author')
+        reader = User.objects.create(username='reader')
+        for _ in range(2):
+            Follow.objects.create(user=reader, author=author)
+        Stats.objects.create(user=author, followers_count=2)
+        Stats.objects.create(user=reader, following_count=2)
+        apps = self.migrate(self.after)
+        Stats = apps.get_model('posts', 'Stats')
+        self.assertEqual(apps.get_model('posts', 'Follow').objects.count(), 1)
+        self.assertEqual(
+            Stats.objects.get(user_id=author.pk).followers_count, 1)
+        self.assertEqual(
+            Stats.objects.get(user_id=reader.pk).following_count, 1)
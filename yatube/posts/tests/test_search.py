@@ -0,0 +1,89 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, SearchTerm, User
+from ..search import rebuild, stem, terms
+
+
+class StemTest(TestCase):
+    """Проверка стеммера и разбора текста."""
+    def test_word_forms_share_stem(self):
+        """Формы одного слова приводятся к одной основе."""
+        for words, expected in (
+            (('книга', 'книги', 'книгами', 'книгу'), 'книг'),
+            (('красивая', 'красивые', 'красивого'), 'красив'),
+            (('радость', 'радости'), 'радост'),
+            (('самолёт', 'самолета'), 'самолет'),
+        ):
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_terms_skip_stop_words(self):
+        """Стоп-слова и регистр не влияют на основы."""
+        self.assertEqual(terms('Дома и Города, в море!'),
+                         ['дом', 'город', 'мор'])
+
+
+@override_settings(LIMIT_VIEWS=2)
+class SearchTest(TestCase):
+    """Проверка полнотекстового поиска по постам и комментариям."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.garden = Post.objects.create(
+            text='Сад у дома и сады соседей', author=cls.user)
+        cls.house = Post.objects.create(
+            text='Новый дом у реки', author=cls.user)
+        cls.river = Post.objects.create(
+            text='Рыбалка на реке', author=cls.user)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_results_ranked_by_weight(self):
+        """Чаще встречающиеся слова поднимают пост выше."""
+        self.assertEqual(self.search('сады'), [self.garden])
+        self.assertEqual(self.search('река'), [self.river, self.house])
+        Comment.objects.create(
+            post=self.house, author=self.user, text='Красивая река')
+        self.assertEqual(self.search('река'), [self.house, self.river])
+
+    def test_all_query_words_required(self):
+        """Находятся только посты со всеми словами запроса."""
+        self.assertEqual(self.search('дом реки'), [self.house])
+        self.assertEqual(self.search('сад рыбалка'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_comments_indexed_and_unindexed(self):
+        """Слова комментария находятся, пока комментарий существует."""
+        comment = Comment.objects.create(
+            post=self.garden, author=self.user, text='Отличная рыбалка')
+        self.assertEqual(self.search('отличная'), [self.garden])
+        self.assertEqual(self.search('рыбалка'), [self.river, self.garden])
+        comment.delete()
+        self.assertEqual(self.search('отличная'), [])
+
+    def test_edit_reindexes_post(self):
+        """Правка текста поста обновляет индекс."""
+        post = Post.objects.get(pk=self.river.pk)
+        post.text = 'Прогулка по лесу'
+        post.save()
+        self.assertEqual(self.search('рыбалка'), [])
+        self.assertEqual(self.search('лес'), [post])
+
+    def test_pagination_keeps_query(self):
+        """Ссылки на страницы результатов сохраняют запрос."""
+        Post.objects.create(text='Ещё одна река', author=self.user)
+        response = self.client.get(reverse('posts:search'), {'q': 'река'})
+        self.assertContains(response, '?q=%D1%80%D0%B5%D0%BA%D0%B0&amp;page=2')
+        self.assertEqual(self.search('река', page=2), [self.house])
+
+    def test_rebuild_restores_index(self):
+        """Команда перестроения восстанавливает потерянный индекс."""
+        SearchTerm.objects.all().delete()
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(self.search('дом реки'), [self.house])
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..feed import get_feed
+from ..models import Comment, FeedEntry, Follow, Group, Post, Stats, User
+from ..search import search_posts
+
+
+class SeedYatubeTest(TestCase):
+    """Проверка наполнения базы командой seed_yatube."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('seed_yatube', users=30, groups=3, posts=300,
+                     follows=60, comments=200, batch_size=100,
+                     stdout=StringIO())
+
+    def test_volumes(self):
+        """Создаётся запрошенное число записей."""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 200)
+
+    def test_dates_are_spread(self):
+        """Посты распределены по времени в порядке создания."""
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        self.assertGreater(dates[-1] - dates[0], timedelta(days=300))
+
+    def test_followers_follow_power_law(self):
+        """У первого пользователя подписчиков больше всех."""
+        counts = list(Stats.objects.order_by('user_id').values_list(
+            'followers_count', flat=True))
+        self.assertEqual(counts[0], max(counts))
+        self.assertEqual(sum(counts), 60)
+
+    def test_derived_data_rebuilt(self):
+        """Счётчики, ленты и поисковый индекс собраны без сигналов."""
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(user=follow.user_id).count(),
+            Post.objects.filter(author__following__user=follow.user_id)
+            .count())
+        self.assertIn(Post.objects.filter(
+            author=follow.author_id).first(), get_feed(follow.user))
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(search_posts(word).exists())
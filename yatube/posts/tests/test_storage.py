@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters, thumbnails
+from ..views import post_edit
+from ..models import Post, StoredImage, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00', 1)
+
+
+def gif(name='small.gif', content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, 'image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    """Проверка хранения одинаковых картинок одним файлом."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, image):
+        return Post.objects.create(text='Пост', author=self.user, image=image)
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки под разными именами — один файл."""
+        first = self.create(gif('first.gif'))
+        second = self.create(gif('second.gif'))
+        other = self.create(gif('first.gif', OTHER_GIF))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).refs, 2)
+
+    def test_file_kept_while_referenced(self):
+        """Файл удаляется только вместе с последним постом."""
+        first = self.create(gif())
+        second = self.create(gif())
+        name = first.image.name
+        first.delete()
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 1)
+        second.delete()
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+        storage = Post._meta.get_field('image').storage
+        self.assertTrue(storage.exists(name))
+        counters.remove_image(name)
+        self.assertFalse(storage.exists(name))
+
+    def test_replaced_image_released(self):
+        """Замена картинки снимает ссылку со старого файла."""
+        post = self.create(gif())
+        old_name = post.image.name
+        post.image = gif('other.gif', OTHER_GIF)
+        post.save()
+        self.assertFalse(StoredImage.objects.filter(name=old_name).exists())
+        self.assertEqual(
+            StoredImage.objects.get(name=post.image.name).refs, 1)
+
+    def test_failed_edit_rolls_back_refs(self):
+        """Сбой правки поста не трогает ссылки на картинки."""
+        post = self.create(gif())
+        old_name = post.image.name
+        request = RequestFactory().post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Новый текст', 'image': gif('other.gif', OTHER_GIF)})
+        request.user = self.user
+        with mock.patch.object(thumbnails, 'schedule',
+                               side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                post_edit(request, post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, old_name)
+        self.assertEqual(StoredImage.objects.get().name, old_name)
+        self.assertEqual(StoredImage.objects.get().refs, 1)
+
+    def test_thumbnails_shared(self):
+        """Миниатюры одного файла строятся один раз."""
+        first = self.create(gif())
+        second = self.create(gif())
+        thumbnails.generate(first.pk)
+        with mock.patch.object(thumbnails, 'build') as build:
+            thumbnails.generate(second.pk)
+        build.assert_not_called()
+        self.assertEqual(
+            Post.objects.get(pk=second.pk).thumbnail_urls,
+            Post.objects.get(pk=first.pk).thumbnail_urls)
+
+    def test_recount_images(self):
+        """Пересчёт исправляет разошедшиеся ссылки."""
+        post = self.create(gif())
+        self.create(gif())
+        StoredImage.objects.filter(name=post.image.name).update(refs=7)
+        StoredImage.objects.create(name='posts/lost.gif', refs=1)
+        counters.recount_images()
+        self.assertEqual(
+            dict(StoredImage.objects.values_list('name', 'refs')),
+            {post.image.name: 2})
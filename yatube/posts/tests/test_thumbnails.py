@@ -0,0 +1,161 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core import jobs
+from core.models import Job
+from ..models import Post, User
+from ..thumbnails import (
+    LAYOUTS, SIZES, WIDTHS, generate, prefetch, schedule, variant)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    """Проверка заранее построенных миниатюр."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='author'),
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generate_stores_all_sizes(self):
+        """Все размеры из шаблонов строятся и сохраняются в посте."""
+        generate(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(set(post.thumbnail_urls), set(SIZES))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_schedule_queues_job(self):
+        """Миниатюры строит воркер очереди фоновых задач."""
+        schedule(self.post)
+        self.assertEqual(Job.objects.get().name, 'posts.thumbnails.generate')
+        self.assertEqual(jobs.run_pending(), (1, 0))
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(set(post.thumbnail_urls), set(SIZES))
+
+    def test_templates_use_stored_urls(self):
+        """Ленты и страница поста показывают сохранённые адреса."""
+        generate(self.post.pk)
+        urls = Post.objects.get(pk=self.post.pk).thumbnail_urls
+        pages = {
+            reverse('posts:index'): urls['card'],
+            reverse('posts:post_detail', args={self.post.pk}): urls['detail'],
+        }
+        for page, url in pages.items():
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), url)
+
+    def test_variants_for_srcset(self):
+        """Строятся варианты всех ширин, кроме шире основной и самой
+        картинки: вместо них хранится основной вариант."""
+        generate(self.post.pk)
+        variants = Post.objects.get(pk=self.post.pk).thumbnail_variants
+        for name, (base_width, _, _) in LAYOUTS.items():
+            for width in WIDTHS:
+                url, actual_width, _ = variants[variant(name, width)]
+                with self.subTest(name=name, width=width):
+                    if width > base_width:
+                        self.assertEqual(url, variants[name][0])
+                    else:
+                        self.assertLessEqual(actual_width, width)
+
+    def test_card_has_srcset(self):
+        """Карточка показывает варианты в srcset и грузится лениво."""
+        generate(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        for width in (320, 640, 960):
+            url = post.thumbnail_variants[variant('card', width)][0]
+            with self.subTest(width=width):
+                self.assertContains(response, f'{url} {width}w')
+
+    def test_legacy_thumbnails(self):
+        """Миниатюры, сохранённые только адресами, показываются в src."""
+        Post.objects.filter(pk=self.post.pk).update(
+            thumbnails='{"card": "/media/cache/card.jpg"}')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            '<img class="card-img my-2" src="/media/cache/card.jpg" '
+            'loading="lazy">')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PrefetchTest(TestCase):
+    """Проверка чтения миниатюр страницы одним обращением к sorl."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        for number in range(3):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=author,
+                image=SimpleUploadedFile(
+                    f'small{number}.gif',
+                    SMALL_GIF.replace(b'\x3B', bytes([number]) + b'\x3B'),
+                    'image/gif'),
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_one_query_for_page(self):
+        """Миниатюры всех постов читаются одним запросом и совпадают с
+        get_thumbnail."""
+        geometry, options = SIZES['card']
+        posts = list(Post.objects.all())
+        urls = {post.pk: get_thumbnail(post.image, geometry, **options).url
+                for post in posts}
+        cache.clear()
+        with self.assertNumQueries(1):
+            prefetch(posts, 'card')
+        with self.assertNumQueries(0):
+            prefetch(posts, 'card')
+        for post in posts:
+            with self.subTest(post=post.pk):
+                self.assertEqual(
+                    post.prefetched_thumbnails['card'].url, urls[post.pk])
+
+    def test_built_thumbnails_not_prefetched(self):
+        """Посты с построенными миниатюрами не читаются из sorl."""
+        posts = list(Post.objects.all())
+        for post in posts:
+            generate(post.pk)
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            prefetch(posts, 'card')
@@ -8,6 +8,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
+from core.cache import stats
 from ..models import Comment, Follow, Group, Post, User
 
 
@@ -198,15 +199,29 @@ class TaskPagesTests(TestCase):
             text='New text',
             author=self.user,
         )
+        hits = stats['index', 'hit']
         response = self.client.get(reverse('posts:index'))
-        new_post.delete()
         response_in_cache = self.client.get(reverse('posts:index'))
+        self.assertEqual(stats['index', 'hit'], hits + 1)
         self.assertEqual(response.content, response_in_cache.content)
-        cache.clear()
-        response_not_in_cache = self.client.get(reverse('posts:index'))
-        self.assertNotEqual(
-            response_in_cache.content, response_not_in_cache.content
+        new_post.delete()
+        response_after_delete = self.client.get(reverse('posts:index'))
+        self.assertNotIn(new_post, response_after_delete.context['page_obj'])
+
+    def test_cache_index_page_invalidated_on_edit(self):
+        """Правка поста и переименование группы видны на главной сразу."""
+        self.client.get(reverse('posts:index'))
+        self.client.post(
+            reverse('posts:post_edit', args={self.post.id}),
+            data={'text': 'Исправленный текст', 'group': self.post.group.pk},
         )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный текст')
+        group = Group.objects.get(pk=self.post.group.pk)
+        group.slug = 'renamed_slug'
+        group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '/group/renamed_slug/')
 
     def test_follow_and_unfollow_authorized_user(self):
         """
@@ -287,3 +302,49 @@ class PaginatorViewsTest(TestCase):
                      - self.POSTS_FIRST_PAGE),
                     self.POSTS_SECOND_PAGE
                 )
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страниц не зависит от числа постов на странице.
+
+    В бюджет входят два запроса сессии и пользователя.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='TestGroup', slug='test_slug')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(15):
+            cls.post = Post.objects.create(text=f'Пост {number}',
+                                           author=cls.author,
+                                           group=cls.group)
+            Comment.objects.create(text='Коммент', post=cls.post,
+                                   author=cls.reader)
+        cls.budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_posts', args={cls.group.slug}): 5,
+            reverse('posts:profile', args={cls.author.username}): 6,
+            reverse('posts:post_detail', args={cls.post.id}): 4,
+            reverse('posts:follow_index'): 5,
+        }
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_views_fit_query_budget(self):
+        """Страницы укладываются в фиксированный бюджет запросов."""
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+
+    def test_views_have_no_nplusone(self):
+        """Страницы не повторяют одинаковые запросы для каждого поста."""
+        for url in self.budgets:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url)
+                self.assertEqual(response.query_log.nplusone, [])
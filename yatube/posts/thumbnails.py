@@ -0,0 +1,188 @@
+"""Построение миниатюр картинок постов в фоновых задачах, см. core.jobs.
+
+Шаблоны показывают миниатюры по адресам из ``Post.thumbnails`` и не
+ресайзят картинки во время рендера. Пока миниатюры строятся, шаблоны
+откатываются на ленивый тег ``{% thumbnail %}``.
+
+Каждый размер строится в нескольких ширинах ``WIDTHS`` для ``srcset``,
+см. тег ``responsive_image``. Вариант основной ширины хранится под
+именем размера и служит ``src``, остальные — под ``<имя>_<ширина>``.
+"""
+import json
+import logging
+
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import jobs
+from .models import Post, StoredImage
+
+logger = logging.getLogger(__name__)
+
+# Размеры, которые используют шаблоны: имя -> (ширина, высота, опции).
+LAYOUTS = {
+    'card': (960, 339, {'crop': 'center', 'upscale': True}),
+    'detail': (960, 339, {'upscale': True}),
+}
+# Ширины вариантов для srcset.
+WIDTHS = (320, 640, 960, 1920)
+
+
+def variant(name, width):
+    """Имя варианта размера name заданной ширины."""
+    return name if width == LAYOUTS[name][0] else f'{name}_{width}'
+
+
+# Все миниатюры картинки: имя варианта -> (геометрия, опции).
+SIZES = {
+    variant(name, width): (
+        f'{width}x{round(height * width / base_width)}', options)
+    for name, (base_width, height, options) in LAYOUTS.items()
+    for width in WIDTHS
+}
+
+
+def build(image):
+    """Строит все миниатюры картинки.
+
+    Возвращает для каждого варианта адрес, ширину и высоту. Варианты
+    шире основного, но шире и самой картинки, не строятся: вместо них
+    хранится основной вариант.
+    """
+    thumbnails = {}
+    for name, (base_width, height, options) in LAYOUTS.items():
+        # Основной вариант строится первым.
+        for width in sorted(WIDTHS, key=lambda width: width != base_width):
+            if width > base_width and width > image.width:
+                thumbnails[variant(name, width)] = thumbnails[name]
+                continue
+            geometry, options = SIZES[variant(name, width)]
+            thumbnail = get_thumbnail(image, geometry, **options)
+            thumbnails[variant(name, width)] = (
+                thumbnail.url, thumbnail.width, thumbnail.height)
+    return thumbnails
+
+
+def shared(image_name):
+    """Адреса миниатюр, уже построенных для того же файла картинки."""
+    urls = StoredImage.objects.filter(name=image_name).values_list(
+        'thumbnails', flat=True).first()
+    try:
+        urls = json.loads(urls or '')
+    except ValueError:
+        return None
+    return urls if isinstance(urls, dict) and set(urls) == set(SIZES) else None
+
+
+@jobs.task
+def generate(post_id, rebuild=False):
+    """Строит миниатюры поста и сохраняет их адреса в строке поста.
+
+    Одинаковые картинки хранятся одним файлом, поэтому миниатюры,
+    построенные для другого поста с тем же файлом, берутся готовыми.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    image_name = post.image.name
+    urls = None if rebuild else shared(image_name)
+    if urls is None:
+        urls = build(post.image)
+        StoredImage.objects.filter(name=image_name).update(
+            thumbnails=json.dumps(urls))
+    fields = ['thumbnails', 'version']
+    # Посты, загруженные до posts.images, получают размеры здесь.
+    if post.image_width is None:
+        post.image_width = post.image.width
+        post.image_height = post.image.height
+        post.image_size = post.image.size
+        fields += ['image_width', 'image_height', 'image_size']
+    # Пока миниатюры строились, картинку могли заменить.
+    if Post.objects.filter(pk=post_id, image=image_name).exists():
+        post.thumbnails = json.dumps(urls)
+        post.save(update_fields=fields)
+
+
+def schedule(post):
+    """Ставит построение миниатюр в очередь фоновых задач."""
+    if post.image:
+        generate.delay(post.pk)
+
+
+def thumbnail_name(source, geometry, options):
+    """Имя файла миниатюры, которое выберет ``get_thumbnail``.
+
+    Опции дополняются так же, как в ``ThumbnailBackend.get_thumbnail``.
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def read_many(keys):
+    """Значения ключей хранилища sorl: кэш одним get_many, промахи —
+    одним запросом к базе."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        # Отсутствующие ключи кэшируются, как это делает сам sorl.
+        loaded = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(loaded)
+    return {
+        key: value for key, value in values.items()
+        if value is not None and value != EMPTY_VALUE
+    }
+
+
+def prefetch(posts, name):
+    """Читает миниатюры размера name для постов без построенных
+    миниатюр одним обращением к хранилищу sorl.
+
+    Найденные миниатюры кладутся в ``post.prefetched_thumbnails``, их
+    показывает тег ``responsive_image`` вместо ``get_thumbnail``,
+    которому нужно своё обращение к хранилищу на каждый пост.
+    """
+    geometry, options = SIZES[name]
+    keys = {}
+    for post in posts:
+        post.prefetched_thumbnails = {}
+        if post.image and name not in post.thumbnail_urls:
+            thumbnail = ImageFile(
+                thumbnail_name(ImageFile(post.image), geometry, options),
+                default.storage)
+            keys[add_prefix(thumbnail.key)] = post
+    for key, value in read_many(list(keys)).items():
+        keys[key].prefetched_thumbnails[name] = deserialize_image_file(value)
+
+
+def fallback_url(post, name):
+    """Адрес миниатюры поста, у которого нет построенных миниатюр."""
+    prefetched = getattr(post, 'prefetched_thumbnails', {})
+    if name in prefetched:
+        return prefetched[name].url
+    geometry, options = SIZES[name]
+    try:
+        return get_thumbnail(post.image, geometry, **options).url
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', post.image)
+        return ''
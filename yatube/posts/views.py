@@ -1,27 +1,70 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
+from . import feed, search as full_text, thumbnails
 from .forms import PostForm, CommentForm
 from .models import Group, Follow, Post, User
+from core.cache import cached_page, page_number
+from core.conditional import conditional
+from core.routers import pins_primary, replica_reads
 from core.paginator import paginator
 
 
-@cache_page(settings.CACHE_SECONDS)
+def page_object(request, queryset, **lookup):
+    """Объект страницы: ищется один раз для проверки ETag и для view."""
+    if not hasattr(request, 'page_object'):
+        request.page_object = get_object_or_404(queryset, **lookup)
+    return request.page_object
+
+
+def index_scopes(request):
+    return ('index', 'users')
+
+
+def group_scopes(request, slug):
+    group = page_object(request, Group, slug=slug)
+    return (f'group:{group.pk}', 'users')
+
+
+def profile_scopes(request, username):
+    author = page_object(
+        request, User.objects.select_related('stats'), username=username)
+    return (f'profile:{author.pk}', 'users')
+
+
+def post_scopes(request, post_id):
+    post = page_object(
+        request, Post.objects.select_related('author__stats', 'group'),
+        pk=post_id)
+    scopes = (f'post:{post.pk}', f'profile:{post.author_id}', 'users')
+    return scopes + ((f'group:{post.group_id}',) if post.group_id else ())
+
+
+@replica_reads
+@conditional(index_scopes)
 def index(request):
     template = 'posts/index.html'
     posts = Post.objects.select_related('author', 'group').all()
-    page_obj = paginator(posts, request)
+    if (request.GET.get('cursor')
+            or page_number(request) > settings.INDEX_CACHE_PAGES):
+        page_obj = paginator(posts, request)
+    else:
+        page_obj = cached_page('index', 'index', request, lambda: posts,
+                               settings.INDEX_CACHE_SECONDS)
     context = {
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@replica_reads
+@conditional(group_scopes)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
+    group = page_object(request, Group, slug=slug)
     posts = group.posts.select_related('author').all()
     page_obj = paginator(posts, request)
     context = {
@@ -31,12 +74,31 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    # Результаты упорядочены по рангу, поэтому курсор по дате не подходит.
+    page_obj = full_text.load_posts(
+        paginator(full_text.search_posts(query), request, cursor=False))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': query}) + '&',
+    }
+    return render(request, template, context)
+
+
+@replica_reads
+@conditional(profile_scopes)
 def profile(request, username):
     template = 'posts/profile.html'
     following = False
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator(posts, request)
+    author = page_object(
+        request, User.objects.select_related('stats'), username=username)
+    page_obj = cached_page(
+        'profile', f'profile:{author.pk}', request,
+        lambda: author.posts.select_related('group'),
+        settings.FEED_CACHE_SECONDS)
     if request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author).exists():
         following = True
@@ -48,9 +110,13 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@replica_reads
+@conditional(post_scopes)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = page_object(
+        request, Post.objects.select_related('author__stats', 'group'),
+        pk=post_id)
     form = CommentForm()
     comments = post.comments.select_related('author').all()
     context = {
@@ -62,6 +128,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None,
@@ -70,11 +137,13 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', post.author)
     return render(request, template, {'form': form})
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
     post = get_object_or_404(Post, pk=post_id)
@@ -84,7 +153,12 @@ def post_edit(request, post_id):
                     files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            post.thumbnails = ''
+        post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -94,6 +168,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -106,25 +181,28 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(posts, request)
+    page_obj = cached_page(
+        'feed', f'feed:{request.user.pk}', request,
+        lambda: feed.get_feed(request.user), settings.FEED_CACHE_SECONDS)
     return render(request, template, {'page_obj': page_obj})
 
 
 @login_required
+@pins_primary
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author == request.user or Follow.objects.filter(
-        user=request.user, author=author
-    ).exists():
-        return redirect('posts:profile', username)
-    Follow.objects.create(user=request.user, author=author)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@pins_primary
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(
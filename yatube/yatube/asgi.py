@@ -0,0 +1,19 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. Django 2.2 has no ASGI handler, so the WSGI application
+runs in a thread pool, see core.asgi. Run with any ASGI server, e.g.
+``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(get_wsgi_application(), settings.ASGI_THREADS)
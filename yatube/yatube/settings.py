@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -51,7 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.TimingMiddleware',
+    'core.middleware.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,17 +91,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки, в которых yatube.asgi выполняет запросы: столько запросов
+# процесс обслуживает одновременно. У SQLite у каждого потока своё
+# соединение.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 16))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite настраивается при каждом подключении, см. core.db_backends:
+# WAL, ожидание блокировки до 5 секунд вместо ошибки «database is
+# locked», 64 МБ страничного кэша и 256 МБ отображения файла в память.
+# Соединение переиспользуется запросами потока CONN_MAX_AGE секунд.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 2 ** 20,
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db_backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', 60)),
+        'PRAGMAS': SQLITE_PRAGMAS,
     }
 }
 
+# Реплики только для чтения: пути к копиям базы через запятую в
+# YATUBE_REPLICAS. Страницы лент и постов читаются с реплик, остальное
+# — с default, см. core.routers. Записавший пользователь читает с
+# default ещё REPLICA_PIN_SECONDS секунд — дольше отставания реплик.
+REPLICA_NAMES = [
+    name for name in os.getenv('YATUBE_REPLICAS', '').split(',') if name
+]
+for number, name in enumerate(REPLICA_NAMES, 1):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'], NAME=name, TEST={'MIRROR': 'default'})
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'read_primary'
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,12 +181,42 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в спул и отправляются фоновой задачей через
+# MAIL_DELIVERY_BACKEND пачками по MAIL_BATCH_SIZE по одному
+# соединению, не больше MAIL_RATE_PER_MINUTE писем в минуту на все
+# воркеры run_jobs (счётчик минуты хранится в базе), см. core.mail.
+EMAIL_BACKEND = 'core.mail.SpoolBackend'
+MAIL_DELIVERY_BACKEND = os.getenv(
+    'YATUBE_MAIL_BACKEND',
+    'django.core.mail.backends.filebased.EmailBackend')
+MAIL_BATCH_SIZE = 50
+MAIL_RATE_PER_MINUTE = 100
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 LIMIT_VIEWS = 10
 
-CACHE_SECONDS = 20
+# Навигация по курсору (?cursor=) вместо номеров страниц (?page=).
+CURSOR_PAGINATION = False
+
+# Главная страница сбрасывается сигналами при изменении постов, групп
+# и авторов, поэтому кэшируется надолго. Кэшируются только первые
+# INDEX_CACHE_PAGES страниц: для них известно, какие из них затронуты.
+INDEX_CACHE_SECONDS = 60 * 60 * 24
+INDEX_CACHE_PAGES = 10
+
+# Посты авторов, у которых подписчиков не меньше этого числа, не
+# раскладываются по лентам при публикации, а подмешиваются при чтении.
+FEED_FANOUT_LIMIT = 5000
+# При подписке в ленту сразу добавляются столько последних постов
+# автора, остальные добавляет фоновая задача.
+FEED_BACKFILL_POSTS = 100
+
+# Ленты подписок и страницы профилей сбрасываются сигналами, таймаут
+# ограничивает устаревание лент с постами популярных авторов.
+FEED_CACHE_SECONDS = 60
+
+# Разметка карточки поста кэшируется по версии поста, поэтому надолго.
+POST_CARD_CACHE_SECONDS = 60 * 60 * 24
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
@@ -158,8 +226,110 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Фоновые задачи (core.jobs): миниатюры, удаление файлов картинок,
+# отправка почты.
+# Их выполняет manage.py run_jobs. При JOBS_EAGER задачи выполняются
+# без воркера, в потоке запроса после фиксации транзакции, а отправка
+# почты — в фоновом потоке веб-процесса.
+# Задачи сбрасывают кэш лент, поэтому воркеру нужен общий с
+# веб-процессами кэш (YATUBE_CACHE не locmem), иначе run_jobs не
+# запустится. С кэшем locmem задачи по умолчанию выполняются в запросе.
+JOBS_EAGER = os.getenv(
+    'YATUBE_JOBS_EAGER',
+    '1' if os.getenv('YATUBE_CACHE', 'locmem') == 'locmem' else '0') == '1'
+# Задача с ошибкой повторяется через JOBS_RETRY_DELAY секунд, задержка
+# удваивается до JOBS_RETRY_MAX_DELAY; после JOBS_MAX_ATTEMPTS попыток
+# задача помечается failed. Задачу упавшего воркера другой воркер
+# возьмёт через JOBS_LOCK_SECONDS.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_LOCK_SECONDS = 5 * 60
+JOBS_POLL_SECONDS = 1
+
+# Загрузки пишутся сразу во временный файл, а не держатся в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Загруженные картинки проверяются по заголовку, уменьшаются до
+# IMAGE_MAX_SIDE по большей стороне, теряют EXIF и перекодируются в
+# IMAGE_FORMAT (WEBP или JPEG), см. posts.images.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 2 ** 20
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_SIDE = 1920
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 80
+
+# Кэш выбирается переменными окружения. Бэкенды file, db и memcached
+# общие для всех воркеров gunicorn, locmem у каждого процесса свой.
+# Для db нужно выполнить manage.py createcachetable.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'memcached': ('django.core.cache.backends.memcached.MemcachedCache',
+                  '127.0.0.1:11211'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('YATUBE_CACHE', 'locmem')]
+CACHE_LOCATION = os.getenv('YATUBE_CACHE_LOCATION', CACHE_LOCATION)
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
+# Двухуровневый режим: небольшой LRU в каждом процессе перед общим
+# кэшем. Изменения ключей доходят до других процессов не позже чем
+# через SYNC_INTERVAL секунд.
+if os.getenv('YATUBE_CACHE_TWO_TIER') == '1':
+    CACHES['shared'] = CACHES['default']
+    CACHES['default'] = {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+            'SYNC_INTERVAL': 1,
+        },
     }
+
+# Строка с замерами каждого запроса пишется в журнал yatube.requests на
+# уровне INFO, запросы дольше SLOW_REQUEST_MS миллисекунд — на WARNING.
+# По умолчанию в консоль попадают только медленные запросы.
+SLOW_REQUEST_MS = 500
+
+# SQL-запросы дольше SLOW_QUERY_MS миллисекунд пишутся в журнал
+# yatube.queries. Одинаковый SELECT, выполненный в одном запросе с
+# NPLUSONE_THRESHOLD разными параметрами, считается N+1 и тоже попадает
+# в журнал.
+SLOW_QUERY_MS = 100
+NPLUSONE_THRESHOLD = 3
+
+# Во время manage.py test журналы проекта не пишутся в консоль,
+# тесты проверяют их через assertLogs.
+LOG_HANDLER = 'null' if sys.argv[1:2] == ['test'] else 'console'
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'null': {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': [LOG_HANDLER],
+            'level': os.getenv('YATUBE_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        'yatube.queries': {
+            'handlers': [LOG_HANDLER],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
 }
@@ -3,11 +3,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics
+
 
 urlpatterns = [
     path('auth/', include('users.urls')),
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
 ]